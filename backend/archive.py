@@ -0,0 +1,98 @@
+"""
+Cold storage for games that no longer change.
+
+Finished games and long-abandoned waiting rooms are moved out of the live
+``games`` collection into an archive collection, one zlib-compressed BSON blob
+per game plus the few fields needed to find it again.
+"""
+
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import bson
+from pymongo import ASCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+]
+# Top-level fields kept uncompressed next to the blob
+INDEXED_FIELDS = ("id", "room_code", "status", "version", "created_at", "updated_at")
+
+
+def pack_archived(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Archive entry for a live game document"""
+    data = {k: v for k, v in doc.items() if k != "_id"}
+    entry = {field: data.get(field) for field in INDEXED_FIELDS}
+    entry["archived_at"] = datetime.utcnow()
+    entry["data"] = bson.Binary(zlib.compress(bson.encode(data)))
+    return entry
+
+
+def unpack_archived(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The original game document (without _id) from an archive entry"""
+    return bson.decode(zlib.decompress(entry["data"]))
+
+
+async def find_archived(archive, game_id: str) -> Optional[Dict[str, Any]]:
+    entry = await archive.find_one({"id": game_id})
+    return unpack_archived(entry) if entry else None
+
+
+async def archived_version(archive, game_id: str) -> Optional[int]:
+    entry = await archive.find_one({"id": game_id}, {"_id": 0, "version": 1})
+    return entry.get("version", 0) if entry else None
+
+
+def archivable_filter(abandoned_before: datetime) -> Dict[str, Any]:
+    """Live games that are over: finished, or waiting for a second player since before abandoned_before"""
+    return {
+        "$or": [
+            {"status": "finished"},
+            {"status": "waiting", "updated_at": {"$lt": abandoned_before}},
+        ]
+    }
+
+
+async def archive_batch(live, archive, abandoned_before: datetime, batch_size: int,
+                        on_archived: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """Move one batch of finished or abandoned games to the archive; returns how many moved"""
+    cursor = live.find(archivable_filter(abandoned_before)).limit(batch_size)
+    moved = 0
+    async for doc in cursor:
+        # Copy first so a crash leaves a duplicate rather than a lost game; live copies win on lookup
+        await archive.replace_one({"id": doc["id"]}, pack_archived(doc), upsert=True)
+        version_match: Any = doc.get("version", 0) or {"$in": [0, None]}
+        result = await live.delete_one({"_id": doc["_id"], "version": version_match})
+        if result.deleted_count == 0:
+            # Someone joined the room in the meantime; it is live again
+            await archive.delete_one({"id": doc["id"], "version": doc.get("version")})
+            continue
+        moved += 1
+        if on_archived is not None:
+            on_archived(doc)
+    return moved
+
+
+async def run_archiver(live, archive, interval: float, abandoned_after: timedelta, batch_size: int,
+                       on_archived: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """Archive continuously: drain full batches back to back, then sleep for interval seconds"""
+    while True:
+        try:
+            moved = batch_size
+            total = 0
+            while moved == batch_size:
+                moved = await archive_batch(live, archive, datetime.utcnow() - abandoned_after, batch_size, on_archived)
+                total += moved
+            if total:
+                logger.info("Archived %d games", total)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Archiving games failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,147 @@
+"""
+Vectorized King's Valley rules for many boards at once.
+
+Boards are ``(N, 5, 5)`` int8 arrays: 0 is empty, 1/2 are player 1's pawn and
+king, -1/-2 are player 2's pawn and king. Players are an ``(N,)`` array of 1
+or 2. Squares are numbered ``row * 5 + col`` as in ``rules``; slide targets are
+indexed by the eight directions in ``rules.DIRECTIONS``.
+"""
+
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+import rules
+
+EMPTY = 0
+PAWN = 1
+KING = 2
+
+MAX_RAY = rules.BOARD_SIZE - 1
+
+
+def _ray_squares() -> np.ndarray:
+    rays = np.full((rules.NUM_SQUARES, len(rules.DIRECTIONS), MAX_RAY), -1, dtype=np.int64)
+    for sq in range(rules.NUM_SQUARES):
+        row, col = divmod(sq, rules.BOARD_SIZE)
+        for d, (dr, dc) in enumerate(rules.DIRECTIONS):
+            for k in range(MAX_RAY):
+                target = rules.square(row + dr * (k + 1), col + dc * (k + 1))
+                if target < 0:
+                    break
+                rays[sq, d, k] = target
+    return rays
+
+
+# RAY_SQUARES[sq, d, k]: square k + 1 steps from sq in direction d, or -1 off the board
+RAY_SQUARES = _ray_squares()
+
+
+class Expansion(NamedTuple):
+    parent: np.ndarray  # (M,) index of the board each move was generated from
+    from_sq: np.ndarray  # (M,)
+    to_sq: np.ndarray  # (M,)
+    boards: np.ndarray  # (M, 5, 5) successor boards
+    winners: np.ndarray  # (M,) winner after the move, including the opponent having no reply; 0 if none
+
+
+def encode(positions: Iterable[rules.Bitboard]) -> np.ndarray:
+    """Stack bitboards into an (N, 5, 5) int8 array"""
+    rows = []
+    for bb in positions:
+        cells = [0] * rules.NUM_SQUARES
+        for sq in range(rules.NUM_SQUARES):
+            cell = rules.cell_at(bb, sq)
+            if cell is not None:
+                player, is_king = cell
+                value = KING if is_king else PAWN
+                cells[sq] = value if player == 1 else -value
+        rows.append(cells)
+    return np.asarray(rows, dtype=np.int8).reshape(-1, rules.BOARD_SIZE, rules.BOARD_SIZE)
+
+
+def decode(boards: np.ndarray) -> List[rules.Bitboard]:
+    """Convert an (N, 5, 5) array back to bitboards"""
+    flat = boards.reshape(len(boards), rules.NUM_SQUARES)
+    weights = np.left_shift(np.int64(1), np.arange(rules.NUM_SQUARES, dtype=np.int64))
+    p1 = ((flat > 0) * weights).sum(axis=1)
+    p2 = ((flat < 0) * weights).sum(axis=1)
+    kings = ((np.abs(flat) == KING) * weights).sum(axis=1)
+    return [rules.Bitboard(int(a), int(b), int(k)) for a, b, k in zip(p1, p2, kings)]
+
+
+def slide_targets(boards: np.ndarray, players: np.ndarray) -> np.ndarray:
+    """(N, 25, 8) array of slide destinations for each own piece and direction, -1 where no move exists"""
+    n = len(boards)
+    flat = boards.reshape(n, rules.NUM_SQUARES)
+    occupied = flat != EMPTY
+    sign = np.where(np.asarray(players) == 1, 1, -1).astype(np.int8)[:, None]
+    own = (flat * sign) > 0
+
+    targets = np.full((n, rules.NUM_SQUARES, len(rules.DIRECTIONS)), -1, dtype=np.int8)
+    for d in range(len(rules.DIRECTIONS)):
+        alive = own.copy()
+        for k in range(MAX_RAY):
+            squares = RAY_SQUARES[:, d, k]
+            on_board = squares >= 0
+            free = np.zeros_like(occupied)
+            free[:, on_board] = ~occupied[:, squares[on_board]]
+            alive &= free
+            if not alive.any():
+                break
+            targets[:, :, d] = np.where(alive, squares.astype(np.int8), targets[:, :, d])
+    return targets
+
+
+def legal_move_mask(boards: np.ndarray, players: np.ndarray) -> np.ndarray:
+    """(N, 25, 25) boolean mask of legal (from, to) pairs"""
+    targets = slide_targets(boards, players)
+    n = len(boards)
+    mask = np.zeros((n, rules.NUM_SQUARES, rules.NUM_SQUARES), dtype=bool)
+    board_idx, from_idx, dir_idx = np.nonzero(targets >= 0)
+    mask[board_idx, from_idx, targets[board_idx, from_idx, dir_idx]] = True
+    return mask
+
+
+def is_legal(boards: np.ndarray, players: np.ndarray, from_sq: Sequence[int], to_sq: Sequence[int]) -> np.ndarray:
+    """(N,) boolean array: whether each board's move is legal"""
+    from_sq = np.asarray(from_sq)
+    to_sq = np.asarray(to_sq)
+    in_range = (from_sq >= 0) & (from_sq < rules.NUM_SQUARES) & (to_sq >= 0) & (to_sq < rules.NUM_SQUARES)
+    safe_from = np.where(in_range, from_sq, 0)
+    safe_to = np.where(in_range, to_sq, 0)
+    targets = slide_targets(boards, players)[np.arange(len(boards)), safe_from]
+    return in_range & (targets == safe_to[:, None]).any(axis=1)
+
+
+def apply_moves(boards: np.ndarray, from_sq: Sequence[int], to_sq: Sequence[int]) -> np.ndarray:
+    """Copy of boards with one (already validated) move applied to each"""
+    n = len(boards)
+    flat = boards.reshape(n, rules.NUM_SQUARES).copy()
+    rows = np.arange(n)
+    from_sq = np.asarray(from_sq)
+    to_sq = np.asarray(to_sq)
+    pieces = flat[rows, from_sq]
+    flat[rows, from_sq] = EMPTY
+    flat[rows, to_sq] = pieces
+    return flat.reshape(n, rules.BOARD_SIZE, rules.BOARD_SIZE)
+
+
+def winners(boards: np.ndarray, players: Optional[np.ndarray] = None) -> np.ndarray:
+    """(N,) int8 array: the owner of the king on the centre, else the opponent of a player to move who cannot move; 0 if none"""
+    center = boards.reshape(len(boards), rules.NUM_SQUARES)[:, rules.CENTER]
+    won = np.select([center == KING, center == -KING], [1, 2], 0).astype(np.int8)
+    if players is None:
+        return won
+    players = np.asarray(players)
+    stuck = (won == 0) & ~(slide_targets(boards, players) >= 0).any(axis=(1, 2))
+    return np.where(stuck, 3 - players, won).astype(np.int8)
+
+
+def expand(boards: np.ndarray, players: np.ndarray) -> Expansion:
+    """Every legal move of every board with its successor board and winner"""
+    targets = slide_targets(boards, players)
+    parent, from_sq, direction = np.nonzero(targets >= 0)
+    to_sq = targets[parent, from_sq, direction].astype(np.int64)
+    successors = apply_moves(boards[parent], from_sq, to_sq)
+    return Expansion(parent, from_sq, to_sq, successors, winners(successors, 3 - np.asarray(players)[parent]))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+King's Valley rules-engine benchmarks
+
+Run from the backend directory, e.g. ``python bench.py movegen``.
+``python bench.py gate`` fails when the shared rules hot path is slower than
+the recorded baseline; ``--update`` records a new one after an intended change.
+The gate runs with the test suite (tests/test_bench_gate.py).
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import typer
+
+import batch
+import engine
+import models
+import rules
+
+app = typer.Typer(help="King's Valley rules-engine benchmarks")
+
+BASELINE_PATH = Path(__file__).parent / "bench_baseline.json"
+# Gate costs are ratios to this workload, timed in the same run, so they carry over between machines
+REFERENCE = "reference slide generation"
+SAMPLE_SECONDS = 0.005
+
+
+def sample_positions(count: int, seed: int = 0) -> List[Tuple[rules.Bitboard, int]]:
+    """Collect (position, player to move) pairs from random playouts"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        bb = rules.INITIAL_BITBOARD
+        player = 1
+        for _ in range(40):
+            moves = rules.legal_moves(bb, player)
+            if not moves or rules.winner(bb):
+                break
+            positions.append((bb, player))
+            bb = rules.apply_move(bb, *rng.choice(moves))
+            player = 3 - player
+    return positions[:count]
+
+
+def report(label: str, count: int, unit: str, elapsed: float) -> None:
+    rate = count / elapsed if elapsed else float("inf")
+    typer.echo(f"{label:<32} {count:>10} {unit:<10} {elapsed * 1000:>9.1f} ms  {rate:>14,.0f} {unit}/s")
+
+
+@app.command()
+def movegen(positions: int = 20000, seed: int = 0):
+    """Throughput of legal-move generation against pairwise validation"""
+    sample = sample_positions(positions, seed)
+
+    start = time.perf_counter()
+    generated = 0
+    for bb, player in sample:
+        generated += len(rules.legal_moves(bb, player))
+    elapsed = time.perf_counter() - start
+    report("legal_moves", len(sample), "positions", elapsed)
+    report("legal_moves", generated, "moves", elapsed)
+
+    start = time.perf_counter()
+    validated = 0
+    squares = range(rules.NUM_SQUARES)
+    for bb, player in sample:
+        validated += sum(1 for frm in squares for to in squares if rules.is_legal(bb, player, frm, to))
+    report("is_legal over all pairs", len(sample), "positions", time.perf_counter() - start)
+
+    if validated != generated:
+        typer.echo(f"MISMATCH: generated {generated} moves, validated {validated}", err=True)
+        raise typer.Exit(code=1)
+
+
+def reference_moves(sample: List[Tuple[rules.Bitboard, int]]) -> None:
+    """Fixed reference workload: square-by-square slide generation that is never optimized, only timed"""
+    for bb, player in sample:
+        occupied = bb.p1 | bb.p2
+        own = bb.p1 if player == 1 else bb.p2
+        moves = []
+        for sq in range(rules.NUM_SQUARES):
+            if not (own >> sq) & 1:
+                continue
+            row, col = divmod(sq, rules.BOARD_SIZE)
+            for dr, dc in rules.DIRECTIONS:
+                r, c = row, col
+                while (0 <= r + dr < rules.BOARD_SIZE and 0 <= c + dc < rules.BOARD_SIZE
+                       and not (occupied >> ((r + dr) * rules.BOARD_SIZE + c + dc)) & 1):
+                    r, c = r + dr, c + dc
+                if (r, c) != (row, col):
+                    moves.append((sq, r * rules.BOARD_SIZE + c))
+
+
+def hot_path_steps(positions: int, seed: int) -> Tuple[int, Dict[str, Callable[[], None]]]:
+    """Sample size and the steps both APIs run on every move request, each looping over the sample"""
+    rng = random.Random(seed)
+    sample = sample_positions(positions, seed)
+    boards = [models.board_from_bitboard(bb) for bb, _ in sample]
+    moves = [rng.choice(rules.legal_moves(bb, player)) for bb, player in sample]
+    requests = [
+        (board, models.Position(row=frm // 5, col=frm % 5), models.Position(row=to // 5, col=to % 5), player)
+        for board, (_, player), (frm, to) in zip(boards, sample, moves)
+    ]
+
+    def from_board():
+        for board in boards:
+            rules.from_board(board)
+
+    def is_valid_move():
+        for board, from_pos, to_pos, player in requests:
+            models.is_valid_move(board, from_pos, to_pos, player)
+
+    def legal_moves():
+        for bb, player in sample:
+            rules.legal_moves(bb, player)
+
+    def apply_move():
+        for (bb, _), (frm, to) in zip(sample, moves):
+            rules.winner(rules.apply_move(bb, frm, to))
+
+    def board_from_bitboard():
+        for bb, _ in sample:
+            models.board_from_bitboard(bb)
+
+    return len(sample), {
+        REFERENCE: lambda: reference_moves(sample),
+        "rules.from_board": from_board,
+        "models.is_valid_move": is_valid_move,
+        "rules.legal_moves": legal_moves,
+        "rules.apply_move+winner": apply_move,
+        "models.board_from_bitboard": board_from_bitboard,
+    }
+
+
+def best_seconds(steps: Dict[str, Callable[[], None]], rounds: int) -> Dict[str, float]:
+    """Fastest of rounds timings of each step, taken in turn so slow spells on the machine hit every step alike"""
+    timers = {name: timeit.Timer(step) for name, step in steps.items()}
+    # Short timings fit inside one scheduler slice, so the fastest of them is an undisturbed run
+    numbers = {name: max(1, int(SAMPLE_SECONDS / timer.timeit(1))) for name, timer in timers.items()}
+    best = dict.fromkeys(steps, float("inf"))
+    for _ in range(rounds):
+        for name, timer in timers.items():
+            best[name] = min(best[name], timer.timeit(numbers[name]) / numbers[name])
+    return best
+
+
+@app.command()
+def gate(
+    positions: int = 500,
+    seed: int = 0,
+    rounds: int = 15,
+    tolerance: float = typer.Option(0.25, help="Allowed slowdown against the baseline, as a fraction"),
+    attempts: int = typer.Option(3, help="Measurements a step must fail in a row to count as a regression"),
+    update: bool = typer.Option(False, help="Record the current costs as the new baseline"),
+    baseline: Path = BASELINE_PATH,
+):
+    """Fail if a shared rules hot path got slower relative to the fixed reference workload timed alongside it"""
+    count, steps = hot_path_steps(positions, seed)
+    seconds = best_seconds(steps, rounds)
+    costs = {name: seconds[name] / seconds[REFERENCE] for name in steps if name != REFERENCE}
+    recorded = {} if update or not baseline.is_file() else json.loads(baseline.read_text())
+
+    def regressed(name: str) -> bool:
+        return name in recorded and costs[name] / recorded[name] - 1 > tolerance
+
+    # A real regression survives re-measuring; a noisy reading does not
+    for _ in range(attempts - 1):
+        suspects = [name for name in costs if regressed(name)]
+        if not suspects:
+            break
+        again = best_seconds({name: steps[name] for name in (REFERENCE, *suspects)}, rounds)
+        for name in suspects:
+            costs[name] = min(costs[name], again[name] / again[REFERENCE])
+
+    typer.echo(f"{'step':<28} {'us/op':>8} {'x ref':>8} {'baseline':>9} {'change':>8}")
+    for name, cost in costs.items():
+        line = f"{name:<28} {seconds[name] / count * 1e6:>8.2f} {cost:>8.3f}"
+        if name in recorded:
+            line += f" {recorded[name]:>9.3f} {cost / recorded[name] - 1:>+8.0%}"
+        typer.echo(line)
+
+    regressions = [name for name in costs if regressed(name)]
+    if not recorded:
+        baseline.write_text(json.dumps({name: round(cost, 4) for name, cost in costs.items()}, indent=2) + "\n")
+        typer.echo(f"baseline written to {baseline}")
+    elif regressions:
+        typer.echo(f"REGRESSION beyond {tolerance:.0%}: {', '.join(regressions)}", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command(name="batch")
+def batch_expand(positions: int = 50000, seed: int = 0):
+    """Expand every legal move of many boards: NumPy batch path against the scalar path"""
+    sample = sample_positions(positions, seed)
+    boards = batch.encode(bb for bb, _ in sample)
+    players = np.array([player for _, player in sample], dtype=np.int8)
+
+    start = time.perf_counter()
+    expansion = batch.expand(boards, players)
+    report("batch.expand", len(sample), "positions", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    successors = 0
+    for bb, player in sample:
+        for frm, to in rules.legal_moves(bb, player):
+            rules.game_winner(rules.apply_move(bb, frm, to), 3 - player)
+            successors += 1
+    report("scalar legal_moves/apply_move", len(sample), "positions", time.perf_counter() - start)
+
+    if successors != len(expansion.parent):
+        typer.echo(f"MISMATCH: batch produced {len(expansion.parent)} successors, scalar {successors}", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def search(positions: int = 20, budget_ms: int = 100, seed: int = 0):
+    """Depth and node rate the engine reaches within the per-move budget"""
+    sample = sample_positions(positions, seed)
+    depths = []
+    nodes = 0
+    start = time.perf_counter()
+    for bb, player in sample:
+        result = engine.search(bb, player, budget_ms / 1000, table=engine.TranspositionTable())
+        depths.append(result.depth)
+        nodes += result.nodes
+    elapsed = time.perf_counter() - start
+    report("engine.search", nodes, "nodes", elapsed)
+    typer.echo(f"depth min/avg/max: {min(depths)}/{sum(depths) / len(depths):.1f}/{max(depths)}")
+
+
+@app.command(name="get-game")
+def get_game(move_counts: str = "0,50,500", requests: int = 1000):
+    """Per-request CPU for the GET /api/game/{game_id} body: warm (cached model), cold (stored document) and pre-encoded"""
+    # Importing server only needs the settings; no database is contacted
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "bench")
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    import server
+
+    response_field = create_response_field(name="Response_get_game", type_=server.Game)
+
+    async def response_model(hydrate):
+        # What FastAPI does with a returned model: dump, validate against response_model, encode
+        for _ in range(requests):
+            content = await serialize_response(field=response_field, response_content=hydrate())
+            JSONResponse(content).body
+
+    def cpu_per_request(run) -> float:
+        start = time.process_time()
+        run()
+        return (time.process_time() - start) / requests * 1e6
+
+    def repeat(build):
+        for _ in range(requests):
+            build()
+
+    typer.echo(f"{'moves':>5} {'warm: response_model':>22} {'model_dump_json':>16} "
+               f"{'cold: hydrate+validate':>23} {'stored document':>16} {'cached bytes':>13}  (us CPU per request)")
+    for moves in (int(n) for n in move_counts.split(",")):
+        game = server.Game(room_code="BENCH", game_state=server.GameState(board=server.initialize_board()))
+        # Synthetic history: serialization cost depends on its length, not on legality
+        game.game_state.moves = [
+            server.Move(from_pos=server.Position(row=4, col=0), to_pos=server.Position(row=1, col=0), player=1 + i % 2)
+            for i in range(moves)
+        ]
+        doc = server.encode_game(game)
+        game = server.decode_game(doc)
+        key = (game.id, "game")
+        server.response_bodies.set(key, server.EncodedBody(game.version, server.stored_game_json(doc)))
+        columns = [
+            cpu_per_request(lambda: asyncio.run(response_model(lambda: game))),
+            cpu_per_request(lambda: repeat(lambda: game.model_dump_json())),
+            cpu_per_request(lambda: asyncio.run(response_model(lambda: server.decode_game(doc)))),
+            cpu_per_request(lambda: repeat(lambda: server.stored_game_json(doc))),
+            cpu_per_request(lambda: repeat(lambda: server.encoded_response(server.response_bodies.get(key), "gzip").body)),
+        ]
+        typer.echo(f"{moves:>5} {columns[0]:>22.1f} {columns[1]:>16.1f} {columns[2]:>23.1f} {columns[3]:>16.1f} "
+                   f"{columns[4]:>13.1f}")
+    server.engine_executor.shutdown()
+
+
+if __name__ == "__main__":
+    app()
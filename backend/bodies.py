@@ -0,0 +1,67 @@
+"""
+Pre-encoded HTTP response bodies.
+
+A body is serialized once and its compressed variants are produced the first
+time a client asks for them, so every later request for the same game version
+is served from memory as-is.
+"""
+
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# Smaller bodies are not worth a Content-Encoding round trip
+MIN_COMPRESS_SIZE = 512
+
+COMPRESSORS = {"gzip": lambda data: gzip.compress(data, compresslevel=6, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=5)
+
+# Server preference when a client accepts several
+PREFERRED_ENCODINGS = [encoding for encoding in ("br", "gzip") if encoding in COMPRESSORS]
+
+
+class EncodedBody:
+    """A serialized JSON body for one version, with lazily built compressed variants"""
+
+    __slots__ = ("version", "final", "identity", "_variants")
+
+    def __init__(self, version: int, identity: bytes, final: bool = False):
+        self.version = version
+        self.final = final  # the resource can no longer change
+        self.identity = identity
+        self._variants: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """The body in the given Content-Encoding, or uncompressed for None"""
+        if encoding is None:
+            return self.identity
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = COMPRESSORS[encoding](self.identity)
+        return variant
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """The preferred Content-Encoding the client accepts for a body of this size, or None"""
+    if not accept_encoding or size < MIN_COMPRESS_SIZE:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(name.strip().lower())
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
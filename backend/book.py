@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Opening book for King's Valley.
+
+Maps each position of the first ``plies`` moves of finished games, keyed by
+its packed position (``tablebase.pack``), to the moves played there with how
+many games played them and how many of those the mover went on to win.
+
+The file is a header plus one sorted fixed-width record per (position, move),
+so loading is a single read into a NumPy array and a lookup is a binary
+search. Games finishing in this process go to an in-memory overlay; ``save``
+merges the overlay into whatever is on disk under a file lock, so several
+workers can keep adding to the same book.
+
+Build from an export with ``python book.py build games.ndjson --output opening.kvbook``.
+"""
+
+import fcntl
+import itertools
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import typer
+
+import ingest
+import rules
+import tablebase
+
+MAGIC = b"KVBOOK01"
+HEADER = struct.Struct("<8sIQ")  # magic, plies covered, record count
+RECORD = np.dtype([("key", "<u8"), ("move", "<u2"), ("games", "<u4"), ("wins", "<u4")])
+DEFAULT_PLIES = 16
+BUILD_BATCH_SIZE = 1000
+
+
+class BookMove(NamedTuple):
+    from_sq: int
+    to_sq: int
+    games: int
+    wins: int  # games the side to move went on to win after playing this move
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+def pack_move(frm: int, to: int) -> int:
+    return frm | (to << 5)
+
+
+class OpeningBook:
+    """Sorted on-disk records plus an overlay of games added since the last save"""
+
+    def __init__(self, records: Optional[np.ndarray] = None, plies: int = DEFAULT_PLIES):
+        self.records = records if records is not None else np.zeros(0, dtype=RECORD)
+        self.plies = plies
+        self.overlay: Dict[int, Dict[int, List[int]]] = {}  # key -> move -> [games, wins]
+        self.saving: Dict[int, Dict[int, List[int]]] = {}  # overlay being merged by a save in progress
+        self.pending_games = 0
+        # save runs in a worker thread while the server keeps adding and reading games on its loop
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Optional[Path], plies: int = DEFAULT_PLIES) -> "OpeningBook":
+        """The book at path, or an empty one if there is no file yet"""
+        if not path or not Path(path).is_file():
+            return cls(plies=plies)
+        records, file_plies = read_records(Path(path))
+        return cls(records, file_plies)
+
+    def add_game(self, moves: Iterable[Tuple[int, int]], winner: Optional[int]) -> None:
+        """Count the opening of one finished game"""
+        bb = rules.INITIAL_BITBOARD
+        player = 1
+        counts = []
+        for ply, (frm, to) in enumerate(moves):
+            if ply >= self.plies:
+                break
+            counts.append((tablebase.pack(bb, player), pack_move(frm, to), winner == player))
+            bb = rules.apply_move(bb, frm, to)
+            player = 3 - player
+        with self.lock:
+            for key, move, won in counts:
+                add_counts(self.overlay, key, move, 1, won)
+            self.pending_games += 1
+
+    def moves(self, bb: rules.Bitboard, player: int) -> List[BookMove]:
+        """Book moves for player in this position, most played first"""
+        key = tablebase.pack(bb, player)
+        counts: Dict[int, List[int]] = {}
+        start, end = np.searchsorted(self.records["key"], np.array([key, key + 1], dtype=np.uint64))
+        for record in self.records[start:end]:
+            counts[int(record["move"])] = [int(record["games"]), int(record["wins"])]
+        with self.lock:
+            for overlay in (self.saving, self.overlay):
+                for move, (games, wins) in overlay.get(key, {}).items():
+                    total = counts.setdefault(move, [0, 0])
+                    total[0] += games
+                    total[1] += wins
+        book_moves = [BookMove(move & 31, move >> 5, games, wins) for move, (games, wins) in counts.items()]
+        return sorted(book_moves, key=lambda m: (-m.games, -m.wins))
+
+    def best_move(self, bb: rules.Bitboard, player: int, min_games: int = 1) -> Optional[BookMove]:
+        """The move with the best smoothed win rate among those played at least min_games times"""
+        candidates = [m for m in self.moves(bb, player) if m.games >= min_games]
+        if not candidates:
+            return None
+        # Laplace smoothing keeps a single lucky win from outranking a well-tested line
+        return max(candidates, key=lambda m: ((m.wins + 1) / (m.games + 2), m.games))
+
+    def save(self, path: Path) -> None:
+        """Merge the overlay into the file at path (re-read under a lock) and adopt the result"""
+        path = Path(path)
+        # Games finishing while the file is written (save may run in a thread) land in a fresh overlay
+        with self.lock:
+            self.saving, self.overlay = self.overlay, {}
+            pending, self.pending_games = self.pending_games, 0
+        try:
+            with open(path.with_suffix(path.suffix + ".lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                on_disk = read_records(path)[0] if path.is_file() else np.zeros(0, dtype=RECORD)
+                merged = merge_records(on_disk, overlay_records(self.saving))
+                write_records(path, merged, self.plies)
+            with self.lock:
+                self.records, self.saving = merged, {}
+        except BaseException:
+            with self.lock:
+                for key, moves in self.saving.items():
+                    for move, (games, wins) in moves.items():
+                        add_counts(self.overlay, key, move, games, wins)
+                self.pending_games += pending
+                self.saving = {}
+            raise
+
+
+def add_counts(overlay: Dict[int, Dict[int, List[int]]], key: int, move: int, games: int, wins: int) -> None:
+    counts = overlay.setdefault(key, {}).setdefault(move, [0, 0])
+    counts[0] += games
+    counts[1] += wins
+
+
+def overlay_records(overlay: Dict[int, Dict[int, List[int]]]) -> np.ndarray:
+    rows = [(key, move, games, wins) for key, moves in overlay.items() for move, (games, wins) in moves.items()]
+    return np.array(rows, dtype=RECORD)
+
+
+def merge_records(*parts: np.ndarray) -> np.ndarray:
+    """Sum records sharing a (key, move) and sort them"""
+    combined = np.concatenate(parts)
+    if not len(combined):
+        return combined
+    order = np.lexsort((combined["move"], combined["key"]))
+    combined = combined[order]
+    starts = np.ones(len(combined), dtype=bool)
+    starts[1:] = (combined["key"][1:] != combined["key"][:-1]) | (combined["move"][1:] != combined["move"][:-1])
+    first = np.nonzero(starts)[0]
+    merged = combined[first].copy()
+    merged["games"] = np.add.reduceat(combined["games"], first)
+    merged["wins"] = np.add.reduceat(combined["wins"], first)
+    return merged
+
+
+def read_records(path: Path) -> Tuple[np.ndarray, int]:
+    data = path.read_bytes()
+    magic, plies, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a King's Valley opening book")
+    return np.frombuffer(data, dtype=RECORD, count=count, offset=HEADER.size).copy(), plies
+
+
+def write_records(path: Path, records: np.ndarray, plies: int) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, plies, len(records)))
+        f.write(records.tobytes())
+    os.replace(tmp_path, path)
+
+
+def document_moves(doc: dict) -> List[Tuple[int, int]]:
+    """(from, to) squares of a stored game document"""
+    return [rules.unpack_move(packed)[:2] for packed in doc["game_state"]["moves"]]
+
+
+def finished_games(lines: List[bytes]) -> Tuple[List[dict], int]:
+    """Stored documents of the finished games among export lines, replayed by ingest, and how many were rejected"""
+    docs, _, errors = ingest.convert_lines(lines)
+    return [doc for doc in docs if doc["status"] == "finished"], len(errors)
+
+
+app = typer.Typer(help="King's Valley opening book tools")
+
+
+@app.command()
+def build(
+    games: Path = typer.Argument(..., help="NDJSON export of finished games (GET /api/games/export)"),
+    output: Path = typer.Option(Path("opening.kvbook"), help="Book file to write or extend"),
+    plies: int = typer.Option(DEFAULT_PLIES, help="Moves from the start to record"),
+    fresh: bool = typer.Option(False, help="Replace the book instead of adding to it"),
+):
+    """Add every finished game of an export to the book"""
+    started = time.perf_counter()
+    if fresh and output.is_file():
+        output.unlink()
+    book = OpeningBook(plies=plies)
+    rejected = 0
+    with open(games, "rb") as f:
+        # Replay every record through the rules first so an illegal move never reaches the book
+        while lines := list(itertools.islice(f, BUILD_BATCH_SIZE)):
+            docs, batch_rejected = finished_games(lines)
+            rejected += batch_rejected
+            for doc in docs:
+                book.add_game(document_moves(doc), doc["game_state"]["winner"])
+    added = book.pending_games
+    book.save(output)
+    typer.echo(f"added {added} games, {len(book.records)} positions x moves -> {output} "
+               f"in {time.perf_counter() - started:.1f}s")
+    if rejected:
+        typer.echo(f"skipped {rejected} records that do not replay under the rules", err=True)
+
+
+@app.command()
+def probe(path: Path, board: str = typer.Argument(rules.to_string(rules.INITIAL_BITBOARD),
+                                                 help="25-character board string, see rules.to_string"),
+          player: int = 1):
+    """List the book moves of one position"""
+    started = time.perf_counter()
+    book = OpeningBook.load(path)
+    loaded = time.perf_counter() - started
+    typer.echo(f"loaded {len(book.records)} records in {loaded * 1000:.1f} ms")
+    for move in book.moves(rules.from_string(board), player):
+        typer.echo(f"{move.from_sq:>2} -> {move.to_sq:>2}  {move.games:>8} games  {move.win_rate:.1%} won")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,264 @@
+"""
+King's Valley search engine.
+
+Negamax alpha-beta with iterative deepening under a wall-clock budget and a
+Zobrist-hashed transposition table of fixed size. Positions are the bitboards
+from ``rules``; scores are from the point of view of the side to move.
+"""
+
+import random
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+import rules
+
+WIN_SCORE = 100000
+# Scores beyond this are wins/losses at a known distance
+WIN_THRESHOLD = WIN_SCORE - 1000
+MAX_DEPTH = 64
+TIME_CHECK_INTERVAL = 1024
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Piece kinds for Zobrist keys: player 1 pawn/king, player 2 pawn/king
+P1_PAWN, P1_KING, P2_PAWN, P2_KING = 0, 1, 2, 3
+
+_rng = random.Random(0x4B56)
+ZOBRIST_PIECES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_rng.getrandbits(64) for _ in range(rules.NUM_SQUARES)) for _ in range(4)
+)
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+Move = Tuple[int, int]
+
+
+class SearchResult(NamedTuple):
+    move: Optional[Move]
+    score: int
+    depth: int
+    nodes: int
+    pv: Tuple[Move, ...] = ()  # expected line of play, starting with move
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def piece_kind(bb: rules.Bitboard, sq: int) -> int:
+    """Zobrist piece kind of the piece on sq (which must be occupied)"""
+    king = (bb.kings >> sq) & 1
+    return (P1_PAWN if (bb.p1 >> sq) & 1 else P2_PAWN) + king
+
+
+def zobrist_hash(bb: rules.Bitboard, player: int) -> int:
+    """Full Zobrist hash of a position with player to move"""
+    h = ZOBRIST_SIDE if player == 2 else 0
+    occupied = bb.p1 | bb.p2
+    while occupied:
+        low = occupied & -occupied
+        occupied ^= low
+        sq = low.bit_length() - 1
+        h ^= ZOBRIST_PIECES[piece_kind(bb, sq)][sq]
+    return h
+
+
+class TranspositionTable:
+    """Fixed-size hash table with depth-preferred, generation-aged replacement"""
+
+    def __init__(self, size_bits: int = 16):
+        self.mask = (1 << size_bits) - 1
+        self.entries: List[Optional[tuple]] = [None] * (1 << size_bits)
+        self.generation = 0
+
+    def new_search(self) -> None:
+        self.generation += 1
+
+    def clear(self) -> None:
+        self.entries = [None] * len(self.entries)
+        self.generation = 0
+
+    def probe(self, key: int) -> Optional[tuple]:
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: Optional[Move]) -> None:
+        index = key & self.mask
+        entry = self.entries[index]
+        # Keep deeper results from the current search; stale entries always yield
+        if entry is None or entry[5] != self.generation or entry[0] == key or depth >= entry[1]:
+            self.entries[index] = (key, depth, score, flag, move, self.generation)
+
+
+def king_reaches_center(bb: rules.Bitboard, player: int) -> bool:
+    """Whether player's king can slide onto the centre square this turn"""
+    kings = bb.kings & rules.player_mask(bb, player)
+    if not kings:
+        return False
+    sq = kings.bit_length() - 1
+    d = rules.DIRECTION_BETWEEN[sq * rules.NUM_SQUARES + rules.CENTER]
+    return d >= 0 and rules.slide_target(bb.p1 | bb.p2, sq, d) == rules.CENTER
+
+
+def _king_distance(bb: rules.Bitboard, player: int) -> int:
+    kings = bb.kings & rules.player_mask(bb, player)
+    if not kings:
+        return 4
+    row, col = divmod(kings.bit_length() - 1, rules.BOARD_SIZE)
+    return max(abs(row - 2), abs(col - 2))
+
+
+def evaluate(bb: rules.Bitboard, player: int) -> int:
+    """Static evaluation from the point of view of player (to move)"""
+    opponent = 3 - player
+    score = 20 * (_king_distance(bb, opponent) - _king_distance(bb, player))
+    if king_reaches_center(bb, player):
+        score += 500
+    if king_reaches_center(bb, opponent):
+        score -= 300
+    return score
+
+
+class Searcher:
+    def __init__(self, table: TranspositionTable, deadline: float):
+        self.table = table
+        self.deadline = deadline
+        self.nodes = 0
+        self.history = [0] * (rules.NUM_SQUARES * rules.NUM_SQUARES)
+
+    def negamax(self, bb: rules.Bitboard, player: int, depth: int, alpha: int, beta: int,
+                ply: int, key: int) -> Tuple[int, Optional[Move]]:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        won = rules.winner(bb)
+        if won is not None:
+            score = WIN_SCORE - ply
+            return (score if won == player else -score), None
+        if depth == 0:
+            return evaluate(bb, player), None
+
+        original_alpha = alpha
+        tt_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                score = _score_from_table(entry[2], ply)
+                flag = entry[3]
+                if flag == EXACT:
+                    return score, tt_move
+                if flag == LOWER and score >= beta:
+                    return score, tt_move
+                if flag == UPPER and score <= alpha:
+                    return score, tt_move
+
+        moves = rules.legal_moves(bb, player)
+        if not moves:
+            # A player who cannot move has lost
+            return -(WIN_SCORE - ply), None
+
+        own_king = bb.kings & rules.player_mask(bb, player)
+        for move in moves:
+            if move[1] == rules.CENTER and (own_king >> move[0]) & 1:
+                return WIN_SCORE - ply - 1, move
+
+        history = self.history
+        moves.sort(key=lambda m: history[m[0] * rules.NUM_SQUARES + m[1]], reverse=True)
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        opponent = 3 - player
+        for frm, to in moves:
+            kind_keys = ZOBRIST_PIECES[piece_kind(bb, frm)]
+            child_key = key ^ kind_keys[frm] ^ kind_keys[to] ^ ZOBRIST_SIDE
+            child = rules.apply_move(bb, frm, to)
+            score = -self.negamax(child, opponent, depth - 1, -beta, -alpha, ply + 1, child_key)[0]
+            if score > best_score:
+                best_score = score
+                best_move = (frm, to)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                history[frm * rules.NUM_SQUARES + to] += depth * depth
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, depth, _score_to_table(best_score, ply), flag, best_move)
+        return best_score, best_move
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    if score > WIN_THRESHOLD:
+        return score + ply
+    if score < -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score > WIN_THRESHOLD:
+        return score - ply
+    if score < -WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+_default_table = TranspositionTable()
+
+
+def search(bb: rules.Bitboard, player: int, time_budget: float = 0.1, max_depth: int = MAX_DEPTH,
+           table: Optional[TranspositionTable] = None) -> SearchResult:
+    """Iteratively deepen until time_budget seconds elapse and return the best move found"""
+    if table is None:
+        table = _default_table
+    table.new_search()
+    searcher = Searcher(table, time.perf_counter() + time_budget)
+    key = zobrist_hash(bb, player)
+
+    moves = rules.legal_moves(bb, player)
+    if not moves or rules.winner(bb) is not None:
+        return SearchResult(None, 0, 0, 0)
+    result = SearchResult(moves[0], 0, 0, 0)
+
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move = searcher.negamax(bb, player, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 0, key)
+        except SearchTimeout:
+            break
+        if move is not None:
+            result = SearchResult(move, score, depth, searcher.nodes)
+        # A forced result will not change with more depth
+        if abs(score) > WIN_THRESHOLD:
+            break
+    return result._replace(nodes=searcher.nodes,
+                           pv=principal_variation(bb, player, result.move, table, max(result.depth, 1)))
+
+
+def principal_variation(bb: rules.Bitboard, player: int, move: Optional[Move], table: TranspositionTable,
+                        max_length: int) -> Tuple[Move, ...]:
+    """Line starting with move, continued by the best moves stored in the table"""
+    pv: List[Move] = []
+    seen = set()
+    key = zobrist_hash(bb, player)
+    while move is not None and len(pv) < max_length and key not in seen and rules.is_legal(bb, player, *move):
+        seen.add(key)
+        pv.append(move)
+        bb = rules.apply_move(bb, *move)
+        if rules.winner(bb) is not None:
+            break
+        player = 3 - player
+        key = zobrist_hash(bb, player)
+        entry = table.probe(key)
+        move = entry[4] if entry is not None else None
+    return tuple(pv)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Bulk import of NDJSON game records
+
+Records use the ``/api/games/export`` shape. Each one is replayed through the
+rules before it is written, rejecting any illegal move or misreported result.
+Valid games become compact schema-2 documents and are inserted in unordered
+``insert_many`` batches, several batches in flight at once. Input is only read
+as fast as batches complete, and the number of input lines fully written is
+checkpointed so an interrupted import resumes where it stopped. Records without
+an id get one derived from their content, so re-importing the same lines is a
+no-op.
+
+Example: ``python ingest.py games.ndjson --processes 4``
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+import typer
+from pymongo.errors import BulkWriteError
+
+import rules
+
+# Stored document layout written here; must match server.GAME_SCHEMA_VERSION
+STORED_SCHEMA = 2
+STATUSES = ("waiting", "in_progress", "finished")
+IMPORT_NAMESPACE = uuid.UUID("6f1c5e2a-93b4-4c1e-9d57-2b8a0f4e7c31")
+MAX_REPORTED_ERRORS = 100
+
+
+class RecordError(ValueError):
+    """A record that is malformed or does not replay under the rules"""
+
+
+class ImportStats:
+    """Running totals of an import"""
+
+    def __init__(self, lines: int = 0):
+        self.lines = lines  # input lines fully processed, including any skipped on resume
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "reason": reason})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def _square(move: Dict[str, Any], field: str, index: int) -> int:
+    position = move.get(field)
+    if not isinstance(position, dict) or not all(isinstance(position.get(axis), int) for axis in ("row", "col")):
+        raise RecordError(f"move {index} {field} must be {{row, col}}")
+    sq = rules.square(position["row"], position["col"])
+    if sq < 0:
+        raise RecordError(f"move {index} {field} is off the board")
+    return sq
+
+
+def _timestamp(value: Any, default: datetime) -> datetime:
+    if value is None:
+        return default
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise RecordError(f"Bad timestamp {value!r}")
+
+
+def record_to_document(record: Dict[str, Any], line: bytes) -> Dict[str, Any]:
+    """Replay a record under the rules and build its stored document"""
+    players = record.get("players")
+    if not isinstance(players, list) or not 1 <= len(players) <= 2:
+        raise RecordError("players must list one or two players")
+    if not all(isinstance(player, dict) for player in players):
+        raise RecordError("every player must be an object")
+    numbers = [player.get("player_number") for player in players]
+    if numbers != list(range(1, len(players) + 1)):
+        raise RecordError("players must be numbered 1 then 2")
+    if not all(isinstance(player.get("name"), str) and player["name"] for player in players):
+        raise RecordError("every player needs a name")
+    room_code = record.get("room_code")
+    if not isinstance(room_code, str) or not room_code:
+        raise RecordError("room_code is required")
+    if not isinstance(record.get("id") or "", str):
+        raise RecordError("id must be a string")
+
+    created_at = _timestamp(record.get("created_at"), datetime.utcnow())
+    moves = record.get("moves") or []
+    if not isinstance(moves, list) or not all(isinstance(move, dict) for move in moves):
+        raise RecordError("moves must be a list of objects")
+    if moves and len(players) < 2:
+        raise RecordError("moves recorded with only one player")
+
+    bb = rules.INITIAL_BITBOARD
+    player = 1
+    winner = None
+    packed_moves = []
+    for index, move in enumerate(moves):
+        if winner is not None:
+            raise RecordError(f"move {index} comes after player {winner} won")
+        frm = _square(move, "from_pos", index)
+        to = _square(move, "to_pos", index)
+        if move.get("player", player) != player:
+            raise RecordError(f"move {index} is by player {move.get('player')} but it is player {player}'s turn")
+        if not rules.is_legal(bb, player, frm, to):
+            raise RecordError(f"move {index} is illegal")
+        bb = rules.apply_move(bb, frm, to)
+        timestamp = move.get("timestamp")
+        offset_ms = 0
+        if timestamp:
+            offset_ms = max(0, int((_timestamp(timestamp, created_at) - created_at).total_seconds() * 1000))
+        packed_moves.append(rules.pack_move(frm, to, player, offset_ms))
+        winner = rules.game_winner(bb, 3 - player)
+        if winner is None:
+            player = 3 - player
+
+    status = record.get("status", "finished" if winner else "in_progress")
+    if status not in STATUSES:
+        raise RecordError(f"Unknown status {status!r}")
+    if record.get("winner") != winner:
+        raise RecordError(f"recorded winner {record.get('winner')} but the moves give {winner}")
+    if (status == "finished") != (winner is not None):
+        raise RecordError(f"status {status} does not match the replayed result")
+    if (status == "waiting") != (len(players) == 1):
+        raise RecordError(f"status {status} does not match {len(players)} player(s)")
+
+    return {
+        "id": record.get("id") or str(uuid.uuid5(IMPORT_NAMESPACE, line.decode("utf-8", "replace"))),
+        "room_code": room_code,
+        "players": [
+            {
+                "id": str(uuid.uuid4()),
+                "name": p["name"],
+                "player_number": p["player_number"],
+                "is_engine": bool(p.get("is_engine", False)),
+            }
+            for p in players
+        ],
+        "game_state": {
+            "board": rules.to_string(bb),
+            # The winner keeps the turn, as in server.play_move
+            "current_player": player,
+            "moves": packed_moves,
+            "winner": winner,
+        },
+        "status": status,
+        # One write for the join plus one per move, as if the game had been played here
+        "version": len(players) - 1 + len(moves),
+        "created_at": created_at,
+        "updated_at": _timestamp(record.get("updated_at"), created_at),
+        "schema": STORED_SCHEMA,
+    }
+
+
+def convert_lines(lines: List[bytes]) -> Tuple[List[Dict[str, Any]], List[int], List[Tuple[int, str]]]:
+    """Documents for the valid lines, their positions in lines, and (position, reason) for the rest"""
+    docs = []
+    positions = []
+    errors = []
+    for position, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = orjson.loads(line)
+            if not isinstance(record, dict):
+                raise RecordError("record must be a JSON object")
+            docs.append(record_to_document(record, line))
+            positions.append(position)
+        except (ValueError, TypeError, AttributeError) as error:
+            # Anything one record can raise (RecordError and orjson.JSONDecodeError are ValueErrors)
+            # rejects that record, never the batch
+            errors.append((position, str(error) or type(error).__name__))
+    return docs, positions, errors
+
+
+async def batched_lines(chunks: AsyncIterator[bytes], batch_size: int, skip: int = 0) -> AsyncIterator[Tuple[int, List[bytes]]]:
+    """(number of lines before the batch, batch) from a byte stream, dropping the first skip lines"""
+    buffer = b""
+    seen = 0
+    first = skip
+    batch: List[bytes] = []
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            seen += 1
+            if seen <= skip:
+                continue
+            batch.append(line)
+            if len(batch) == batch_size:
+                yield first, batch
+                first += len(batch)
+                batch = []
+    if buffer.strip() and seen >= skip:
+        batch.append(buffer)
+    if batch:
+        yield first, batch
+
+
+async def insert_batch(collection, docs: List[Dict[str, Any]], lines: List[int], stats: ImportStats) -> None:
+    """insert_many without ordering, so one bad document does not stop the rest"""
+    if not docs:
+        return
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        stats.inserted += len(result.inserted_ids)
+    except BulkWriteError as error:
+        stats.inserted += error.details.get("nInserted", 0)
+        for write_error in error.details.get("writeErrors", []):
+            line = lines[write_error["index"]]
+            if write_error.get("code") != 11000:
+                stats.reject(line, write_error.get("errmsg", "write failed"))
+            elif "room_code" in write_error.get("errmsg", ""):
+                stats.reject(line, "room code is held by another open game")
+            else:
+                stats.duplicates += 1
+
+
+Converter = Callable[[List[bytes]], Awaitable[Tuple[List[Dict[str, Any]], List[int], List[Tuple[int, str]]]]]
+
+
+async def ingest(batches: AsyncIterator[Tuple[int, List[bytes]]], collection, convert: Converter,
+                 max_in_flight: int = 4, stats: Optional[ImportStats] = None,
+                 on_checkpoint: Optional[Callable[[ImportStats], None]] = None) -> ImportStats:
+    """Convert and insert batches with at most max_in_flight pending; checkpoints advance in input order"""
+    stats = stats or ImportStats()
+
+    async def process(first: int, lines: List[bytes]) -> None:
+        docs, positions, errors = await convert(lines)
+        for position, reason in errors:
+            stats.reject(first + position + 1, reason)
+        await insert_batch(collection, docs, [first + position + 1 for position in positions], stats)
+
+    pending: Deque[Tuple[int, asyncio.Task]] = deque()
+
+    async def complete_oldest() -> None:
+        end, task = pending.popleft()
+        await task
+        stats.lines = end
+        if on_checkpoint is not None:
+            on_checkpoint(stats)
+
+    try:
+        async for first, lines in batches:
+            if len(pending) >= max_in_flight:
+                # Back-pressure: stop reading input until the oldest batch is written
+                await complete_oldest()
+            pending.append((first + len(lines), asyncio.create_task(process(first, lines))))
+        while pending:
+            await complete_oldest()
+    finally:
+        for _, task in pending:
+            task.cancel()
+    return stats
+
+
+app = typer.Typer(help="Import NDJSON game records into MongoDB")
+
+
+@app.command()
+def run(
+    path: Path = typer.Argument(..., help="NDJSON file, one game record per line"),
+    batch_size: int = typer.Option(1000, help="Records per insert_many"),
+    processes: int = typer.Option(os.cpu_count() or 1, help="Worker processes replaying records"),
+    checkpoint: Optional[Path] = typer.Option(None, help="Progress file; defaults to PATH.checkpoint"),
+    restart: bool = typer.Option(False, help="Ignore an existing checkpoint and start from the first line"),
+):
+    """Replay, verify and insert every record of PATH, resuming from its checkpoint"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    checkpoint = checkpoint or path.with_suffix(path.suffix + ".checkpoint")
+    skip = 0
+    if checkpoint.is_file() and not restart:
+        skip = orjson.loads(checkpoint.read_bytes())["lines"]
+        typer.echo(f"resuming after line {skip}")
+
+    def save_checkpoint(stats: ImportStats) -> None:
+        tmp_path = checkpoint.with_suffix(checkpoint.suffix + ".tmp")
+        tmp_path.write_bytes(orjson.dumps(stats.as_dict()))
+        os.replace(tmp_path, checkpoint)
+
+    async def file_chunks() -> AsyncIterator[bytes]:
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                yield chunk
+
+    async def main() -> ImportStats:
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        loop = asyncio.get_running_loop()
+        try:
+            with ProcessPoolExecutor(processes) as pool:
+                return await ingest(
+                    batched_lines(file_chunks(), batch_size, skip),
+                    client[os.environ['DB_NAME']].games,
+                    lambda lines: loop.run_in_executor(pool, convert_lines, lines),
+                    max_in_flight=processes * 2,
+                    stats=ImportStats(skip),
+                    on_checkpoint=save_checkpoint,
+                )
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    stats = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    processed = stats.inserted + stats.duplicates + stats.rejected
+    typer.echo(f"{stats.inserted} inserted, {stats.duplicates} already present, {stats.rejected} rejected "
+               f"in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:,.0f} records/s)")
+    for error in stats.errors:
+        typer.echo(f"line {error['line']}: {error['reason']}", err=True)
+
+
+if __name__ == "__main__":
+    app()
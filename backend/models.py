@@ -0,0 +1,79 @@
+"""
+Game models and board helpers shared by both APIs.
+
+``backend/server.py`` and ``deployment/api/index.py`` build their request and
+response models on these pieces and positions and check every move with
+``rules`` on bitboards, so the two deployments accept exactly the same moves.
+
+The Vercel function is deployed on its own, so ``deployment/api`` carries
+copies of this file and ``rules.py``; refresh them with ``yarn sync-rules`` in
+``deployment`` after changing either (tests/test_rules_parity.py checks them).
+"""
+
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+import rules
+
+
+class PieceType(str, Enum):
+    KING = "K"
+    PAWN = "P"
+
+
+class GameStatus(str, Enum):
+    WAITING = "waiting"
+    IN_PROGRESS = "in_progress"
+    FINISHED = "finished"
+
+
+class Piece(BaseModel):
+    player: int  # 1 or 2
+    type: PieceType
+
+
+class Position(BaseModel):
+    row: int
+    col: int
+
+
+Board = List[List[Optional[Piece]]]
+
+# One shared instance per kind of piece, keyed by its rules.to_string character; pieces are never mutated
+PIECES = {
+    char: Piece(player=1 if char.isupper() else 2, type=PieceType.KING if char in "Kk" else PieceType.PAWN)
+    for char in "PKpk"
+}
+
+
+def board_from_string(board: str) -> Board:
+    """Nested board from a 25-character board string"""
+    return [
+        [PIECES.get(char) for char in board[row:row + rules.BOARD_SIZE]]
+        for row in range(0, rules.NUM_SQUARES, rules.BOARD_SIZE)
+    ]
+
+
+def board_from_bitboard(bb: rules.Bitboard) -> Board:
+    return board_from_string(rules.to_string(bb))
+
+
+def initialize_board() -> Board:
+    """Initialize the King's Valley board with starting positions"""
+    return board_from_bitboard(rules.INITIAL_BITBOARD)
+
+
+def square_of(position: Position) -> int:
+    return rules.square(position.row, position.col)
+
+
+def is_valid_move(board: Board, from_pos: Position, to_pos: Position, player: int) -> bool:
+    """Validate if a move is legal according to King's Valley rules"""
+    return rules.is_legal(rules.from_board(board), player, square_of(from_pos), square_of(to_pos))
+
+
+def check_winner(board: Board) -> Optional[int]:
+    """Check if there's a winner (king in center)"""
+    return rules.winner(rules.from_board(board))
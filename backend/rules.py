@@ -0,0 +1,247 @@
+"""
+King's Valley rules core on integer bitboards.
+
+The 5x5 board is stored as three 25-bit masks: one per player plus a mask of
+the squares holding a king. Square ``row * 5 + col`` maps to bit
+``row * 5 + col``. Sliding moves are resolved with precomputed per-square ray
+tables, so validation, move application and the win check are a handful of
+integer operations. Pydantic boards are only built at the API edge.
+"""
+
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+BOARD_SIZE = 5
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+CENTER = 2 * BOARD_SIZE + 2
+CENTER_BIT = 1 << CENTER
+FULL_MASK = (1 << NUM_SQUARES) - 1
+
+# The eight sliding directions as (row step, col step)
+DIRECTIONS: Tuple[Tuple[int, int], ...] = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1),
+)
+STEPS: Tuple[int, ...] = tuple(dr * BOARD_SIZE + dc for dr, dc in DIRECTIONS)
+
+
+class Bitboard(NamedTuple):
+    p1: int
+    p2: int
+    kings: int
+
+
+def square(row: int, col: int) -> int:
+    """Square index for a (row, col) pair, or -1 if it is off the board"""
+    if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+        return row * BOARD_SIZE + col
+    return -1
+
+
+def _build_tables():
+    ray_masks = []
+    ray_ends = []
+    direction_between = [-1] * (NUM_SQUARES * NUM_SQUARES)
+    for sq in range(NUM_SQUARES):
+        row, col = divmod(sq, BOARD_SIZE)
+        masks = []
+        ends = []
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            mask = 0
+            end = -1
+            r, c = row + dr, col + dc
+            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                target = square(r, c)
+                mask |= 1 << target
+                end = target
+                direction_between[sq * NUM_SQUARES + target] = d
+                r += dr
+                c += dc
+            masks.append(mask)
+            ends.append(end)
+        ray_masks.append(tuple(masks))
+        ray_ends.append(tuple(ends))
+    return tuple(ray_masks), tuple(ray_ends), tuple(direction_between)
+
+
+# RAY_MASKS[sq][d]: squares strictly beyond sq in direction d
+# RAY_ENDS[sq][d]: last on-board square in direction d, or -1 at the edge
+# DIRECTION_BETWEEN[frm * 25 + to]: direction index from frm to to, or -1
+RAY_MASKS, RAY_ENDS, DIRECTION_BETWEEN = _build_tables()
+
+INITIAL_BITBOARD = Bitboard(
+    p1=0b11111 << square(4, 0),
+    p2=0b11111 << square(0, 0),
+    kings=(1 << square(0, 2)) | (1 << square(4, 2)),
+)
+
+
+def slide_target(occupied: int, sq: int, d: int) -> int:
+    """Square a piece on sq stops on when sliding in direction d, or -1 if it cannot move"""
+    blockers = occupied & RAY_MASKS[sq][d]
+    if not blockers:
+        return RAY_ENDS[sq][d]
+    step = STEPS[d]
+    if step > 0:
+        # Nearest blocker is the lowest bit along an increasing ray
+        first = (blockers & -blockers).bit_length() - 1
+    else:
+        first = blockers.bit_length() - 1
+    target = first - step
+    return target if target != sq else -1
+
+
+def player_mask(bb: Bitboard, player: int) -> int:
+    """Mask of the squares occupied by player"""
+    return bb.p1 if player == 1 else bb.p2
+
+
+def is_legal(bb: Bitboard, player: int, frm: int, to: int) -> bool:
+    """Validate a move between square indices according to King's Valley rules"""
+    if not (0 <= frm < NUM_SQUARES and 0 <= to < NUM_SQUARES):
+        return False
+    if not (player_mask(bb, player) >> frm) & 1:
+        return False
+    d = DIRECTION_BETWEEN[frm * NUM_SQUARES + to]
+    if d < 0:
+        return False
+    return slide_target(bb.p1 | bb.p2, frm, d) == to
+
+
+def legal_moves(bb: Bitboard, player: int) -> List[Tuple[int, int]]:
+    """All legal (from, to) square pairs for player, one slide per piece per direction"""
+    occupied = bb.p1 | bb.p2
+    own = player_mask(bb, player)
+    moves = []
+    while own:
+        low = own & -own
+        own ^= low
+        sq = low.bit_length() - 1
+        masks = RAY_MASKS[sq]
+        ends = RAY_ENDS[sq]
+        for d in range(8):
+            blockers = occupied & masks[d]
+            if not blockers:
+                to = ends[d]
+                if to >= 0:
+                    moves.append((sq, to))
+                continue
+            if STEPS[d] > 0:
+                to = (blockers & -blockers).bit_length() - 1 - STEPS[d]
+            else:
+                to = blockers.bit_length() - 1 - STEPS[d]
+            if to != sq:
+                moves.append((sq, to))
+    return moves
+
+
+def apply_move(bb: Bitboard, frm: int, to: int) -> Bitboard:
+    """Return the position after moving the piece on frm to to (no validation)"""
+    move_mask = (1 << frm) | (1 << to)
+    p1, p2, kings = bb
+    if (p1 >> frm) & 1:
+        p1 ^= move_mask
+    else:
+        p2 ^= move_mask
+    if (kings >> frm) & 1:
+        kings ^= move_mask
+    return Bitboard(p1, p2, kings)
+
+
+def winner(bb: Bitboard) -> Optional[int]:
+    """Player whose king stands on the centre square, if any"""
+    if bb.kings & CENTER_BIT:
+        return 1 if bb.p1 & CENTER_BIT else 2
+    return None
+
+
+def game_winner(bb: Bitboard, player: int) -> Optional[int]:
+    """Winner once it is player's turn: a king on the centre wins, and a player who cannot move has lost"""
+    won = winner(bb)
+    if won is None and not legal_moves(bb, player):
+        return 3 - player
+    return won
+
+
+def from_board(board: List[List[Any]]) -> Bitboard:
+    """Build a bitboard from a nested 5x5 board of pieces (models or dicts)"""
+    # Every API request starts here, so the per-cell work is inlined
+    p1 = p2 = kings = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell is not None:
+                if cell.__class__ is dict:
+                    player = cell["player"]
+                    piece_type = cell["type"]
+                else:
+                    player = cell.player
+                    piece_type = cell.type
+                if player == 1:
+                    p1 |= bit
+                else:
+                    p2 |= bit
+                if piece_type == "K":
+                    kings |= bit
+            bit <<= 1
+    return Bitboard(p1, p2, kings)
+
+
+def cell_at(bb: Bitboard, sq: int) -> Optional[Tuple[int, bool]]:
+    """(player, is_king) for the piece on sq, or None if the square is empty"""
+    bit = 1 << sq
+    if bb.p1 & bit:
+        return 1, bool(bb.kings & bit)
+    if bb.p2 & bit:
+        return 2, bool(bb.kings & bit)
+    return None
+
+
+# Compact board strings: 25 characters row by row, "." empty,
+# "P"/"K" player 1 pawn/king, "p"/"k" player 2 pawn/king
+BOARD_CHARS = {None: ".", (1, False): "P", (1, True): "K", (2, False): "p", (2, True): "k"}
+
+
+def to_string(bb: Bitboard) -> str:
+    """25-character board string"""
+    # Same characters as BOARD_CHARS, read straight off the masks since every stored write calls this
+    p1, p2, kings = bb
+    chars = []
+    bit = 1
+    for _ in range(NUM_SQUARES):
+        if p1 & bit:
+            chars.append("K" if kings & bit else "P")
+        elif p2 & bit:
+            chars.append("k" if kings & bit else "p")
+        else:
+            chars.append(".")
+        bit <<= 1
+    return "".join(chars)
+
+
+def from_string(board: str) -> Bitboard:
+    """Bitboard from a 25-character board string"""
+    if len(board) != NUM_SQUARES:
+        raise ValueError(f"Board string must have {NUM_SQUARES} characters, got {len(board)}")
+    p1 = p2 = kings = 0
+    for sq, char in enumerate(board):
+        bit = 1 << sq
+        if char in "PK":
+            p1 |= bit
+        elif char in "pk":
+            p2 |= bit
+        elif char != ".":
+            raise ValueError(f"Unknown piece {char!r} in board string")
+        if char in "Kk":
+            kings |= bit
+    return Bitboard(p1, p2, kings)
+
+
+def pack_move(frm: int, to: int, player: int, offset_ms: int = 0) -> int:
+    """One int: from square | to square << 5 | (player - 1) << 10 | milliseconds since the game began << 11"""
+    return frm | (to << 5) | ((player - 1) << 10) | (offset_ms << 11)
+
+
+def unpack_move(packed: int) -> Tuple[int, int, int, int]:
+    """(from square, to square, player, milliseconds since the game began)"""
+    return packed & 31, (packed >> 5) & 31, ((packed >> 10) & 1) + 1, packed >> 11
@@ -1,15 +1,32 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
+import bisect
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Tuple, AsyncIterator
 import uuid
-from datetime import datetime
-from enum import Enum
+from datetime import datetime, timedelta, timezone
+import orjson
+
+import archive
+import book
+from bodies import EncodedBody, choose_encoding
+import engine
+import ingest
+from models import Board, GameStatus, Position, PIECES, board_from_string, initialize_board
+import rules
+import tablebase
+from cache import LRUTTLCache
 
 
 ROOT_DIR = Path(__file__).parent
@@ -20,6 +37,75 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Engine searches run in separate processes so they never stall the event loop
+ENGINE_TIME_BUDGET = int(os.environ.get('ENGINE_TIME_BUDGET_MS', '100')) / 1000
+engine_executor = ProcessPoolExecutor(
+    max_workers=int(os.environ.get('ENGINE_WORKERS', '1')),
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+# Search time for /analyze, and analysed positions kept; results only change with the engine, so the TTL is long
+ANALYSIS_TIME_BUDGET = int(os.environ.get('ANALYSIS_TIME_BUDGET_MS', '500')) / 1000
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '10000'))
+ANALYSIS_CACHE_TTL = 24 * 3600
+# Analyses get their own processes so a burst of them cannot delay engine replies in running games,
+# and searches beyond the pending limit are turned away instead of queueing behind each other
+analysis_executor = ProcessPoolExecutor(
+    max_workers=int(os.environ.get('ANALYSIS_WORKERS', '1')),
+    mp_context=multiprocessing.get_context("spawn"),
+)
+ANALYSIS_MAX_PENDING = int(os.environ.get('ANALYSIS_MAX_PENDING', '8'))
+
+# Attempts for a read-modify-write that keeps losing the version race
+WRITE_RETRIES = 3
+
+# Fresh room codes to try before giving up; collisions are rare with 36^6 codes
+ROOM_CODE_ATTEMPTS = 5
+
+# Open games kept in memory; with several workers a cached poll can lag another worker's write by the TTL
+GAME_CACHE_SIZE = int(os.environ.get('GAME_CACHE_SIZE', '10000'))
+GAME_CACHE_TTL = float(os.environ.get('GAME_CACHE_TTL_SECONDS', '10'))
+# How long ids of finished or archived games are remembered so a racing read cannot re-cache them
+CLOSED_GAME_TTL = 3600
+
+# Serialized game and legal-moves bodies kept per game; each is valid for exactly one version
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '5000'))
+RESPONSE_CACHE_TTL = 3600
+
+# Upper bound for how long /game/{game_id}/wait holds a request open
+LONG_POLL_TIMEOUT = float(os.environ.get('LONG_POLL_TIMEOUT_SECONDS', '30'))
+
+# Open rooms per lobby page, and how often each worker re-reads them to pick up other workers' rooms
+LOBBY_PAGE_SIZE = 20
+LOBBY_PAGE_MAX = 100
+LOBBY_RESYNC_INTERVAL = float(os.environ.get('LOBBY_RESYNC_SECONDS', '30'))
+
+# Status checks per page, and documents fetched per round trip when streaming NDJSON
+STATUS_PAGE_SIZE = 100
+STATUS_PAGE_MAX = 1000
+STREAM_BATCH_SIZE = 500
+
+# Games fetched per round trip by /games/export; records are ~1 KB, so a batch stays well under the 16 MB reply limit
+EXPORT_BATCH_SIZE = 1000
+
+# Records per insert_many for /games/import, and batches converted or written at once
+IMPORT_BATCH_SIZE = 1000
+IMPORT_IN_FLIGHT = 2
+
+# Finished games and rooms nobody joined for this long move to the compressed archive
+ARCHIVE_INTERVAL = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '300'))
+ARCHIVE_ABANDONED_AFTER = timedelta(hours=float(os.environ.get('ARCHIVE_ABANDONED_AFTER_HOURS', '24')))
+ARCHIVE_BATCH_SIZE = 500
+
+# Optional solved-position table, memory-mapped so all workers share the page cache
+solved_positions = tablebase.open_tablebase(os.environ.get('TABLEBASE_PATH', str(ROOT_DIR / 'kings_valley.kvtb')))
+
+# Opening book learned from finished games; engines play from it instead of searching while it has enough games
+BOOK_PATH = Path(os.environ.get('BOOK_PATH', str(ROOT_DIR / 'opening.kvbook')))
+BOOK_MIN_GAMES = int(os.environ.get('BOOK_MIN_GAMES', '3'))
+BOOK_SAVE_INTERVAL = float(os.environ.get('BOOK_SAVE_SECONDS', '60'))
+opening_book = book.OpeningBook.load(BOOK_PATH)
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -27,25 +113,7 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 
-# Game Enums
-class PieceType(str, Enum):
-    KING = "K"
-    PAWN = "P"
-
-class GameStatus(str, Enum):
-    WAITING = "waiting"
-    IN_PROGRESS = "in_progress"
-    FINISHED = "finished"
-
-# Game Models
-class Piece(BaseModel):
-    player: int  # 1 or 2
-    type: PieceType
-    
-class Position(BaseModel):
-    row: int
-    col: int
-
+# Game Models (pieces, positions and statuses are shared with the deployment API through models)
 class Move(BaseModel):
     from_pos: Position
     to_pos: Position
@@ -56,9 +124,10 @@ class Player(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     player_number: int  # 1 or 2
+    is_engine: bool = False
 
 class GameState(BaseModel):
-    board: List[List[Optional[Piece]]] = Field(default_factory=lambda: [[None for _ in range(5)] for _ in range(5)])
+    board: Board = Field(default_factory=lambda: [[None for _ in range(5)] for _ in range(5)])
     current_player: int = 1
     moves: List[Move] = []
     winner: Optional[int] = None
@@ -69,12 +138,14 @@ class Game(BaseModel):
     players: List[Player] = []
     game_state: GameState = Field(default_factory=GameState)
     status: GameStatus = GameStatus.WAITING
+    version: int = 0  # incremented on every write
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Request/Response Models
 class CreateGameRequest(BaseModel):
     player_name: str
+    vs_engine: bool = False
 
 class JoinGameRequest(BaseModel):
     room_code: str
@@ -92,6 +163,57 @@ class GameResponse(BaseModel):
     game: Game
     your_player_number: Optional[int] = None
 
+class LegalMove(BaseModel):
+    from_pos: Position
+    to_pos: Position
+
+class LegalMovesResponse(BaseModel):
+    game: Game
+    player: int
+    moves: List[LegalMove]
+
+class HintResponse(BaseModel):
+    player: int
+    move: Optional[LegalMove] = None
+    result: Optional[str] = None  # "win", "loss" or "draw" for the player to move
+    distance: Optional[int] = None  # plies to the end with perfect play
+
+class AnalyzeRequest(BaseModel):
+    board: Board
+    player: int = 1  # side to move
+
+class AnalysisResponse(BaseModel):
+    player: int
+    score: int  # from the point of view of the player to move
+    result: Optional[str] = None  # "win" or "loss" once the search proves a forced result
+    distance: Optional[int] = None  # plies to that result
+    depth: int
+    best_move: Optional[LegalMove] = None
+    pv: List[LegalMove]  # principal variation, starting with best_move
+    cached: bool
+
+class BookEntry(BaseModel):
+    from_pos: Position
+    to_pos: Position
+    games: int
+    wins: int  # games the player to move went on to win after this move
+    win_rate: float
+
+class BookResponse(BaseModel):
+    position: str
+    player: int
+    moves: List[BookEntry]
+
+class LobbyRoom(BaseModel):
+    game_id: str
+    room_code: str
+    host: str
+    created_at: datetime
+
+class LobbyPage(BaseModel):
+    rooms: List[LobbyRoom]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next (older) page
+
 # Legacy Models (keeping for compatibility)
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -102,77 +224,540 @@ class StatusCheckCreate(BaseModel):
     client_name: str
 
 # Game Logic Functions
-def initialize_board() -> List[List[Optional[Piece]]]:
-    """Initialize the King's Valley board with starting positions"""
-    board = [[None for _ in range(5)] for _ in range(5)]
-    
-    # Player 2 (top row)
-    for i in range(5):
-        piece_type = PieceType.KING if i == 2 else PieceType.PAWN
-        board[0][i] = Piece(player=2, type=piece_type)
-    
-    # Player 1 (bottom row)
-    for i in range(5):
-        piece_type = PieceType.KING if i == 2 else PieceType.PAWN
-        board[4][i] = Piece(player=1, type=piece_type)
-    
-    return board
-
-def is_valid_move(board: List[List[Optional[Piece]]], from_pos: Position, to_pos: Position, player: int) -> bool:
-    """Validate if a move is legal according to King's Valley rules"""
-    # Check bounds
-    if not (0 <= from_pos.row < 5 and 0 <= from_pos.col < 5):
-        return False
-    if not (0 <= to_pos.row < 5 and 0 <= to_pos.col < 5):
-        return False
-    
-    # Check if there's a piece at from_pos
-    piece = board[from_pos.row][from_pos.col]
-    if not piece or piece.player != player:
-        return False
-    
-    # Check if destination is empty
-    if board[to_pos.row][to_pos.col] is not None:
-        return False
-    
-    # Calculate direction
-    dr = to_pos.row - from_pos.row
-    dc = to_pos.col - from_pos.col
-    
-    # Must be straight or diagonal
-    if dr != 0 and dc != 0 and abs(dr) != abs(dc):
-        return False
-    
-    # Get step direction
-    step_r = 0 if dr == 0 else (1 if dr > 0 else -1)
-    step_c = 0 if dc == 0 else (1 if dc > 0 else -1)
-    
-    # Check path until blocked or edge
-    r = from_pos.row + step_r
-    c = from_pos.col + step_c
-    
-    while 0 <= r < 5 and 0 <= c < 5 and board[r][c] is None:
-        if r == to_pos.row and c == to_pos.col:
-            # Valid if this is the last square in the direction
-            next_r = r + step_r
-            next_c = c + step_c
-            if (next_r < 0 or next_r >= 5 or 
-                next_c < 0 or next_c >= 5 or 
-                board[next_r][next_c] is not None):
-                return True
+def generate_legal_moves(board: Board, player: int) -> List[LegalMove]:
+    """Generate every legal move for player in a single pass over their pieces"""
+    moves = []
+    for from_sq, to_sq in rules.legal_moves(rules.from_board(board), player):
+        from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+        to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+        moves.append(LegalMove(
+            from_pos=Position(row=from_row, col=from_col),
+            to_pos=Position(row=to_row, col=to_col),
+        ))
+    return moves
+
+def legal_moves_response(game: Game) -> LegalMovesResponse:
+    """Game state plus the legal moves of the player to move"""
+    player = game.game_state.current_player
+    moves = []
+    if game.status == GameStatus.IN_PROGRESS:
+        moves = generate_legal_moves(game.game_state.board, player)
+    return LegalMovesResponse(game=game, player=player, moves=moves)
+
+def play_move(game: Game, bitboard: rules.Bitboard, from_sq: int, to_sq: int, player_number: int) -> rules.Bitboard:
+    """Apply a validated move to the game, record it and return the new bitboard"""
+    from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+    to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+    
+    # Make the move
+    board = game.game_state.board
+    board[to_row][to_col] = board[from_row][from_col]
+    board[from_row][from_col] = None
+    bitboard = rules.apply_move(bitboard, from_sq, to_sq)
+    
+    # Record the move
+    game.game_state.moves.append(Move(
+        from_pos=Position(row=from_row, col=from_col),
+        to_pos=Position(row=to_row, col=to_col),
+        player=player_number
+    ))
+    
+    # Check for winner, including an opponent left without a move
+    winner = rules.game_winner(bitboard, 3 - player_number)
+    if winner:
+        game.game_state.winner = winner
+        game.status = GameStatus.FINISHED
+    else:
+        # Switch turns
+        game.game_state.current_player = 3 - game.game_state.current_player
+
+    return bitboard
+
+def game_squares(game: Game) -> List[Tuple[int, int]]:
+    """(from, to) squares of every move played so far"""
+    return [
+        (rules.square(m.from_pos.row, m.from_pos.col), rules.square(m.to_pos.row, m.to_pos.col))
+        for m in game.game_state.moves
+    ]
+
+class GameConnectionManager:
+    """WebSocket subscribers per game in this process"""
+    
+    def __init__(self):
+        # Each subscriber with the newest version pushed to it, so a late snapshot never overtakes a broadcast
+        self.connections: Dict[str, Dict[WebSocket, int]] = {}
+    
+    async def connect(self, game_id: str, websocket: WebSocket):
+        await websocket.accept()
+        self.connections.setdefault(game_id, {})[websocket] = -1
+    
+    def disconnect(self, game_id: str, websocket: WebSocket):
+        sockets = self.connections.get(game_id)
+        if sockets is None:
+            return
+        sockets.pop(websocket, None)
+        if not sockets:
+            del self.connections[game_id]
+    
+    async def send_snapshot(self, websocket: WebSocket, game: Game):
+        """Send a loaded state to one subscriber unless a broadcast already gave it this version or a newer one"""
+        sockets = self.connections.get(game.id, {})
+        if sockets.get(websocket, -1) >= game.version:
+            return
+        sockets[websocket] = game.version
+        await websocket.send_text(legal_moves_body(game).identity.decode())
+    
+    async def broadcast(self, game: Game):
+        """Push the game state and legal moves to every subscriber of the game"""
+        subscribed = self.connections.get(game.id, {})
+        sockets = [websocket for websocket, version in subscribed.items() if version < game.version]
+        if not sockets:
+            return
+        for websocket in sockets:
+            subscribed[websocket] = game.version
+        payload = legal_moves_body(game).identity.decode()
+        results = await asyncio.gather(
+            *(websocket.send_text(payload) for websocket in sockets),
+            return_exceptions=True
+        )
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.disconnect(game.id, websocket)
+
+game_connections = GameConnectionManager()
+
+class GameWaiters:
+    """Long-poll requests parked on one asyncio event per game in this process"""
+    
+    def __init__(self):
+        self.events: Dict[str, asyncio.Event] = {}
+        self.latest: Dict[str, Game] = {}
+        self.waiting: Dict[str, int] = {}
+    
+    def notify(self, game: Game):
+        """Hand the new state to every parked request for the game"""
+        if game.id not in self.waiting:
+            return
+        self.latest[game.id] = game
+        event = self.events.pop(game.id, None)
+        if event:
+            event.set()
+    
+    def subscribe(self, game_id: str):
+        """Start collecting updates for a waiter; call before reading the current version"""
+        self.waiting[game_id] = self.waiting.get(game_id, 0) + 1
+    
+    def unsubscribe(self, game_id: str):
+        self.waiting[game_id] -= 1
+        if not self.waiting[game_id]:
+            del self.waiting[game_id]
+            self.latest.pop(game_id, None)
+            self.events.pop(game_id, None)
+    
+    async def wait(self, game_id: str, since: int, timeout: float) -> Optional[Game]:
+        """The first published state newer than since, or None on timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            latest = self.latest.get(game_id)
+            if latest and latest.version > since:
+                return latest
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            event = self.events.setdefault(game_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+game_waiters = GameWaiters()
+
+class OpenLobby:
+    """In-memory index of waiting rooms, newest first, so lobby pages never read the database"""
+    
+    def __init__(self):
+        self.rooms: Dict[str, LobbyRoom] = {}
+        self.order: List[Tuple[datetime, str]] = []  # (created_at, game id), ascending
+        self.changes: Optional[Dict[str, Optional[LobbyRoom]]] = None  # recorded while a rebuild query runs
+    
+    def add(self, game: Game):
+        room = LobbyRoom(
+            game_id=game.id, room_code=game.room_code, host=game.players[0].name, created_at=game.created_at
+        )
+        self._put(room)
+        if self.changes is not None:
+            self.changes[game.id] = room
+    
+    def remove(self, game_id: str):
+        room = self.rooms.pop(game_id, None)
+        if room is not None:
+            index = bisect.bisect_left(self.order, (room.created_at, game_id))
+            del self.order[index]
+        if self.changes is not None:
+            self.changes[game_id] = None
+    
+    def _put(self, room: LobbyRoom):
+        if room.game_id in self.rooms:
+            return
+        # MongoDB stores milliseconds, so cursors handed out before a rebuild still match the reloaded rooms
+        room.created_at = room.created_at.replace(microsecond=room.created_at.microsecond // 1000 * 1000)
+        self.rooms[room.game_id] = room
+        bisect.insort(self.order, (room.created_at, room.game_id))
+    
+    async def rebuild(self, load: Callable[[], Awaitable[List[LobbyRoom]]]):
+        """Replace the index with load()'s rooms, keeping adds and removes that happened meanwhile"""
+        self.changes = {}
+        try:
+            rooms = await load()
+        finally:
+            changes, self.changes = self.changes, None
+        self.rooms = {}
+        self.order = []
+        for room in rooms:
+            self._put(room)
+        for game_id, room in changes.items():
+            if room is None:
+                self.remove(game_id)
             else:
-                return False  # Could have gone further
-        r += step_r
-        c += step_c
+                self._put(room)
     
-    return False
+    def page(self, cursor: Optional[str], limit: int) -> LobbyPage:
+        """Up to limit rooms older than cursor"""
+        end = len(self.order)
+        if cursor:
+            created_at, _, game_id = cursor.partition("|")
+            try:
+                after = datetime.fromisoformat(created_at)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid lobby cursor")
+            if after.tzinfo is not None:
+                # Rooms are indexed by naive UTC times
+                after = after.astimezone(timezone.utc).replace(tzinfo=None)
+            end = bisect.bisect_left(self.order, (after, game_id))
+        start = max(0, end - limit)
+        rooms = [self.rooms[game_id] for _, game_id in reversed(self.order[start:end])]
+        next_cursor = None
+        if start > 0:
+            created_at, game_id = self.order[start]
+            next_cursor = f"{created_at.isoformat()}|{game_id}"
+        return LobbyPage(rooms=rooms, next_cursor=next_cursor)
+
+open_lobby = OpenLobby()
+
+async def publish_game_update(game: Game):
+    """Push a committed game state to WebSocket subscribers and long-poll waiters"""
+    game_waiters.notify(game)
+    await game_connections.broadcast(game)
+
+# Stored documents: schema 1 is Game.dict() verbatim. Schema 2 stores the board as a
+# 25-character string (rules.to_string) and each move as one packed int (rules.pack_move)
+GAME_SCHEMA_VERSION = 2
+
+def encode_board(board: Board) -> str:
+    return rules.to_string(rules.from_board(board))
+
+def encode_move(move: Move, created_at: datetime) -> int:
+    offset_ms = max(0, int((move.timestamp - created_at).total_seconds() * 1000))
+    from_sq = rules.square(move.from_pos.row, move.from_pos.col)
+    to_sq = rules.square(move.to_pos.row, move.to_pos.col)
+    return rules.pack_move(from_sq, to_sq, move.player, offset_ms)
+
+def decode_move(packed: int, created_at: datetime) -> Move:
+    from_sq, to_sq, player, offset_ms = rules.unpack_move(packed)
+    from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+    to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+    return Move(
+        from_pos=Position(row=from_row, col=from_col),
+        to_pos=Position(row=to_row, col=to_col),
+        player=player,
+        timestamp=created_at + timedelta(milliseconds=offset_ms)
+    )
+
+def encode_game(game: Game) -> Dict[str, Any]:
+    """Compact schema-2 document for a game"""
+    doc = game.model_dump()
+    doc["schema"] = GAME_SCHEMA_VERSION
+    doc["game_state"]["board"] = encode_board(game.game_state.board)
+    doc["game_state"]["moves"] = [encode_move(move, game.created_at) for move in game.game_state.moves]
+    return doc
 
-def check_winner(board: List[List[Optional[Piece]]]) -> Optional[int]:
-    """Check if there's a winner (king in center)"""
-    center_piece = board[2][2]
-    if center_piece and center_piece.type == PieceType.KING:
-        return center_piece.player
-    return None
+def decode_game(doc: Dict[str, Any]) -> Game:
+    """Game from a stored document of any schema"""
+    if doc.get("schema", 1) < GAME_SCHEMA_VERSION:
+        return Game(**doc)
+    state = doc["game_state"]
+    created_at = doc["created_at"]
+    return Game(**{
+        **doc,
+        "game_state": {
+            **state,
+            "board": board_from_string(state["board"]),
+            "moves": [decode_move(packed, created_at) for packed in state["moves"]],
+        },
+    })
+
+# Finished and archived games are read far more often than they are hydrated for writes,
+# so they are serialized from the stored document without building models at all
+PIECE_JSON = {char: {"player": piece.player, "type": piece.type.value} for char, piece in PIECES.items()}
+
+def stored_move_json(packed: int, created_at: datetime) -> Dict[str, Any]:
+    from_sq, to_sq, player, offset_ms = rules.unpack_move(packed)
+    from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+    to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+    return {
+        "from_pos": {"row": from_row, "col": from_col},
+        "to_pos": {"row": to_row, "col": to_col},
+        "player": player,
+        "timestamp": created_at + timedelta(milliseconds=offset_ms),
+    }
+
+def stored_game_json(doc: Dict[str, Any]) -> bytes:
+    """Game JSON straight from a schema-2 document; same bytes as decode_game(doc).model_dump_json()"""
+    state = doc["game_state"]
+    created_at = doc["created_at"]
+    board = state["board"]
+    payload = {
+        "id": doc["id"],
+        "room_code": doc["room_code"],
+        "players": [
+            {
+                "id": player["id"],
+                "name": player["name"],
+                "player_number": player["player_number"],
+                "is_engine": player.get("is_engine", False),
+            }
+            for player in doc["players"]
+        ],
+        "game_state": {
+            "board": [
+                [PIECE_JSON.get(char) for char in board[row:row + rules.BOARD_SIZE]]
+                for row in range(0, rules.NUM_SQUARES, rules.BOARD_SIZE)
+            ],
+            "current_player": state["current_player"],
+            "moves": [stored_move_json(packed, created_at) for packed in state["moves"]],
+            "winner": state.get("winner"),
+        },
+        "status": doc["status"],
+        "version": doc.get("version", 0),
+        "created_at": created_at,
+        "updated_at": doc["updated_at"],
+    }
+    return orjson.dumps(payload)
+
+async def hydrate_game(doc: Dict[str, Any]) -> Game:
+    """Decode a stored game, rewriting legacy documents in the compact schema on the way"""
+    game = decode_game(doc)
+    if doc.get("schema", 1) < GAME_SCHEMA_VERSION:
+        # Same content, so the version stays; skip if someone else wrote in between
+        version_match: Any = game.version if game.version else {"$in": [0, None]}
+        await db.games.update_one(
+            {"_id": doc["_id"], "version": version_match, "schema": {"$exists": False}},
+            {"$set": {k: v for k, v in encode_game(game).items() if k != "_id"}}
+        )
+    return game
+
+# Cached games are shared between requests: copy before mutating, never mutate in place
+room_games: Dict[str, str] = {}
+
+def forget_room(game_id: str, game: Game):
+    if room_games.get(game.room_code) == game_id:
+        del room_games[game.room_code]
+
+game_cache: LRUTTLCache[Game] = LRUTTLCache(GAME_CACHE_SIZE, GAME_CACHE_TTL, on_evict=forget_room)
+closed_games: LRUTTLCache[bool] = LRUTTLCache(GAME_CACHE_SIZE, CLOSED_GAME_TTL)
+
+OPEN_STATUSES = [GameStatus.WAITING.value, GameStatus.IN_PROGRESS.value]
+
+def remember_game(game: Game):
+    """Write-through: keep an open game cached by id and room code, drop it once finished"""
+    if game.status == GameStatus.FINISHED:
+        forget_game(game.id)
+        return
+    # A read that started before a newer write or before the game closed must not put its snapshot back
+    cached = game_cache.peek(game.id)
+    if closed_games.peek(game.id) or (cached is not None and cached.version > game.version):
+        return
+    game_cache.set(game.id, game)
+    room_games[game.room_code] = game.id
+
+def forget_game(game_id: str):
+    game_cache.pop(game_id)
+    closed_games.set(game_id, True)
+
+async def load_game(game_id: str) -> Optional[Game]:
+    """Game by id, from the cache when possible, falling back to the archive"""
+    game = game_cache.get(game_id)
+    if game is not None:
+        return game
+    
+    game_doc = await db.games.find_one({"id": game_id})
+    if not game_doc:
+        # Archived games never change again, so they are not cached
+        archived_doc = await archive.find_archived(db.games_archive, game_id)
+        return decode_game(archived_doc) if archived_doc else None
+    game = await hydrate_game(game_doc)
+    remember_game(game)
+    return game
+
+# Finished games can never change, so their cached bodies are served without a version check
+response_bodies: LRUTTLCache[EncodedBody] = LRUTTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+def store_body(key: Any, body: EncodedBody) -> EncodedBody:
+    """Cache body unless a newer version is already cached; returns the body to serve"""
+    cached = response_bodies.get(key)
+    if cached is None or cached.version < body.version:
+        response_bodies.set(key, body)
+    return body
+
+def legal_moves_body(game: Game) -> EncodedBody:
+    """The legal-moves body for the game's version, serialized at most once"""
+    cached = response_bodies.get((game.id, "legal-moves"))
+    if cached is not None and cached.version == game.version:
+        return cached
+    body = EncodedBody(
+        game.version,
+        legal_moves_response(game).model_dump_json().encode(),
+        final=game.status == GameStatus.FINISHED
+    )
+    return store_body((game.id, "legal-moves"), body)
+
+async def load_legal_moves_body(game_id: str) -> Optional[EncodedBody]:
+    game = await load_game(game_id)
+    return legal_moves_body(game) if game else None
+
+async def load_game_body(game_id: str) -> Optional[EncodedBody]:
+    """Game body: cached and open games serialize from the model, cold ones from the stored document"""
+    game = game_cache.get(game_id)
+    if game is None:
+        game_doc = await db.games.find_one({"id": game_id})
+        if game_doc and game_doc["status"] in OPEN_STATUSES:
+            # Open games are about to be written, so cache them like load_game does
+            game = await hydrate_game(game_doc)
+            remember_game(game)
+        else:
+            if not game_doc:
+                game_doc = await archive.find_archived(db.games_archive, game_id)
+                if not game_doc:
+                    return None
+            if game_doc.get("schema", 1) < GAME_SCHEMA_VERSION:
+                game = decode_game(game_doc)
+            else:
+                return EncodedBody(
+                    game_doc.get("version", 0),
+                    stored_game_json(game_doc),
+                    final=game_doc["status"] == GameStatus.FINISHED.value
+                )
+    return EncodedBody(game.version, game.model_dump_json().encode(), final=game.status == GameStatus.FINISHED)
+
+async def load_game_by_room(room_code: str, status: Optional[GameStatus] = None) -> Optional[Game]:
+    """Game by room code (optionally in a given status), from the cache when possible"""
+    game_id = room_games.get(room_code)
+    if game_id:
+        game = game_cache.get(game_id)
+        if game is not None and game.room_code == room_code and (status is None or game.status == status):
+            return game
+    
+    if status is not None:
+        game_doc = await db.games.find_one({"room_code": room_code, "status": status})
+    else:
+        # The open game holding the code, else the latest one not archived yet; old finished games are cold
+        game_doc = await db.games.find_one({"room_code": room_code, "status": {"$in": OPEN_STATUSES}})
+        if not game_doc:
+            game_doc = await db.games.find_one({"room_code": room_code}, sort=[("updated_at", -1)])
+    if not game_doc:
+        return None
+    game = await hydrate_game(game_doc)
+    remember_game(game)
+    return game
+
+def move_update(game: Game, new_moves: List[Move]) -> Dict[str, Any]:
+    """Targeted update for moves just played: the board string, turn state and the new packed moves"""
+    return {
+        "$set": {
+            "game_state.board": encode_board(game.game_state.board),
+            "game_state.current_player": game.game_state.current_player,
+            "game_state.winner": game.game_state.winner,
+            "status": game.status,
+            "version": game.version,
+            "updated_at": game.updated_at,
+        },
+        "$push": {"game_state.moves": {"$each": [encode_move(move, game.created_at) for move in new_moves]}},
+    }
+
+class WriteConflict(Exception):
+    """Another request changed the game between our read and our write"""
+
+async def conditional_update(game_id: str, read_version: int, update: Dict[str, Any]):
+    """Apply update only if the game is still at read_version (compare-and-swap)"""
+    version_match: Any = read_version if read_version else {"$in": [0, None]}
+    result = await db.games.update_one(
+        {"id": game_id, "version": version_match, "schema": GAME_SCHEMA_VERSION},
+        update
+    )
+    if result.matched_count == 0:
+        # Our copy is stale; make the retry read the database
+        game_cache.pop(game_id)
+        raise WriteConflict()
+
+async def current_version(game_id: str) -> Optional[int]:
+    """Version of a game without loading the document when it is not cached"""
+    cached = game_cache.get(game_id)
+    if cached is not None:
+        return cached.version
+    version_doc = await db.games.find_one({"id": game_id}, {"_id": 0, "version": 1})
+    if not version_doc:
+        return await archive.archived_version(db.games_archive, game_id)
+    return version_doc.get("version", 0)
+
+def version_etag(version: int) -> str:
+    """ETag for a game version"""
+    return f'"{version}"'
+
+def set_version_headers(response: Response, version: int):
+    """Tag a game response with its version and make clients revalidate it"""
+    response.headers["ETag"] = version_etag(version)
+    response.headers["Cache-Control"] = "no-cache"
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+def not_modified(version: int) -> Response:
+    """304 answer for a client that already holds this version"""
+    return Response(status_code=304, headers={"ETag": version_etag(version), "Cache-Control": "no-cache"})
+
+def encoded_response(body: EncodedBody, accept_encoding: Optional[str]) -> Response:
+    """Serve pre-encoded bytes as-is, compressed if the client accepts it"""
+    encoding = choose_encoding(accept_encoding, len(body.identity))
+    response = Response(content=body.encoded(encoding), media_type="application/json")
+    set_version_headers(response, body.version)
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+async def serve_game_body(game_id: str, kind: str, load: Callable[[str], Awaitable[Optional[EncodedBody]]],
+                          if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+    """A game read from the per-version body cache, rebuilding the body only after the game moved"""
+    key = (game_id, kind)
+    body = response_bodies.get(key)
+    if body is None or not body.final:
+        version = await current_version(game_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        # A client holding the current version needs no body, so a cold cache skips the full load
+        if if_none_match and etag_matches(if_none_match, version_etag(version)):
+            return not_modified(version)
+        if body is None or body.version != version:
+            body = await load(game_id)
+            if body is None:
+                raise HTTPException(status_code=404, detail="Game not found")
+            store_body(key, body)
+    
+    if if_none_match and etag_matches(if_none_match, version_etag(body.version)):
+        return not_modified(body.version)
+    return encoded_response(body, accept_encoding)
 
 def generate_room_code() -> str:
     """Generate a 6-character room code"""
@@ -184,37 +769,53 @@ def generate_room_code() -> str:
 @api_router.post("/game/create", response_model=GameResponse)
 async def create_game(request: CreateGameRequest):
     """Create a new game room"""
-    room_code = generate_room_code()
-    
-    # Ensure room code is unique
-    while await db.games.find_one({"room_code": room_code, "status": {"$ne": GameStatus.FINISHED}}):
-        room_code = generate_room_code()
-    
     player = Player(name=request.player_name, player_number=1)
     game_state = GameState(board=initialize_board())
     
     game = Game(
-        room_code=room_code,
+        room_code=generate_room_code(),
         players=[player],
         game_state=game_state,
         status=GameStatus.WAITING
     )
     
-    await db.games.insert_one(game.dict())
+    # Single-player mode: the server engine takes the second seat
+    if request.vs_engine:
+        game.players.append(Player(name="Engine", player_number=2, is_engine=True))
+        game.status = GameStatus.IN_PROGRESS
+    
+    # The partial unique index on open room codes arbitrates collisions in a single write
+    for _ in range(ROOM_CODE_ATTEMPTS):
+        try:
+            await db.games.insert_one(encode_game(game))
+            break
+        except DuplicateKeyError:
+            game.room_code = generate_room_code()
+    else:
+        raise HTTPException(status_code=503, detail="Could not allocate a room code, please retry")
+    
+    remember_game(game)
+    if game.status == GameStatus.WAITING:
+        open_lobby.add(game)
     return GameResponse(game=game, your_player_number=1)
 
 @api_router.post("/game/join", response_model=GameResponse)
 async def join_game(request: JoinGameRequest):
     """Join an existing game room"""
-    game_doc = await db.games.find_one({
-        "room_code": request.room_code,
-        "status": GameStatus.WAITING
-    })
-    
-    if not game_doc:
+    for _ in range(WRITE_RETRIES):
+        try:
+            return await apply_join_request(request)
+        except WriteConflict:
+            continue
+    raise HTTPException(status_code=409, detail="Game was updated concurrently, please retry")
+
+async def apply_join_request(request: JoinGameRequest) -> GameResponse:
+    """Read, check and conditionally write one join attempt"""
+    cached = await load_game_by_room(request.room_code, GameStatus.WAITING)
+    if not cached:
         raise HTTPException(status_code=404, detail="Game room not found or already started")
     
-    game = Game(**game_doc)
+    game = cached.model_copy(deep=True)
     
     if len(game.players) >= 2:
         raise HTTPException(status_code=400, detail="Game room is full")
@@ -223,32 +824,201 @@ async def join_game(request: JoinGameRequest):
     player = Player(name=request.player_name, player_number=2)
     game.players.append(player)
     game.status = GameStatus.IN_PROGRESS
+    read_version = game.version
+    game.version += 1
     game.updated_at = datetime.utcnow()
     
-    await db.games.update_one(
-        {"_id": game_doc["_id"]},
-        {"$set": game.dict()}
+    await conditional_update(
+        game.id,
+        read_version,
+        {
+            "$set": {"status": game.status, "version": game.version, "updated_at": game.updated_at},
+            "$push": {"players": player.model_dump()}
+        }
     )
+    remember_game(game)
+    open_lobby.remove(game.id)
+    await publish_game_update(game)
     
     return GameResponse(game=game, your_player_number=2)
 
 @api_router.get("/game/{game_id}", response_model=Game)
-async def get_game(game_id: str):
+async def get_game(game_id: str, if_none_match: Optional[str] = Header(None),
+                   accept_encoding: Optional[str] = Header(None)):
     """Get current game state"""
-    game_doc = await db.games.find_one({"id": game_id})
-    if not game_doc:
+    return await serve_game_body(game_id, "game", load_game_body, if_none_match, accept_encoding)
+
+@api_router.get("/game/{game_id}/legal-moves", response_model=LegalMovesResponse)
+async def get_legal_moves(game_id: str, if_none_match: Optional[str] = Header(None),
+                          accept_encoding: Optional[str] = Header(None)):
+    """Get the game state with every legal move for the player to move"""
+    return await serve_game_body(game_id, "legal-moves", load_legal_moves_body, if_none_match, accept_encoding)
+
+@api_router.get("/game/{game_id}/wait", response_model=LegalMovesResponse)
+async def wait_for_game(game_id: str, since: int = 0, timeout: float = LONG_POLL_TIMEOUT,
+                        accept_encoding: Optional[str] = Header(None)):
+    """Hold the request until the game moves past version since; 204 if nothing changed in time"""
+    game_waiters.subscribe(game_id)
+    try:
+        version = await current_version(game_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        if version > since:
+            game = await load_game(game_id)
+        else:
+            game = await game_waiters.wait(game_id, since, min(max(timeout, 0), LONG_POLL_TIMEOUT))
+            if game is None:
+                return Response(status_code=204)
+    finally:
+        game_waiters.unsubscribe(game_id)
+    
+    return encoded_response(legal_moves_body(game), accept_encoding)
+
+@api_router.get("/game/{game_id}/hint", response_model=HintResponse)
+async def get_hint(game_id: str):
+    """Get the perfect-play move for the player to move from the tablebase"""
+    if solved_positions is None:
+        raise HTTPException(status_code=503, detail="Tablebase not available")
+    
+    game = await load_game(game_id)
+    if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    return Game(**game_doc)
+    player = game.game_state.current_player
+    hint = HintResponse(player=player)
+    if game.status != GameStatus.IN_PROGRESS:
+        return hint
+    
+    best = solved_positions.best_move(rules.from_board(game.game_state.board), player)
+    if best:
+        (from_sq, to_sq), outcome = best
+        from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+        to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+        hint.move = LegalMove(
+            from_pos=Position(row=from_row, col=from_col),
+            to_pos=Position(row=to_row, col=to_col),
+        )
+        hint.result = outcome.name
+        hint.distance = outcome.distance
+    return hint
+
+analysis_cache: LRUTTLCache[engine.SearchResult] = LRUTTLCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL)
+analysis_pending: Dict[int, asyncio.Future] = {}
+
+async def analyze_canonical(key: int) -> Tuple[engine.SearchResult, bool]:
+    """Search result for a canonical position key and whether it came from the cache"""
+    result = analysis_cache.get(key)
+    if result is not None:
+        return result, True
+    
+    # Concurrent requests for the same position share one search
+    pending = analysis_pending.get(key)
+    if pending is None:
+        if len(analysis_pending) >= ANALYSIS_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Too many analyses in progress, please retry",
+                                headers={"Retry-After": "1"})
+        bitboard, player = tablebase.unpack(key)
+        pending = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(
+            analysis_executor, engine.search, bitboard, player, ANALYSIS_TIME_BUDGET
+        ))
+        analysis_pending[key] = pending
+        
+        def finish(future: asyncio.Future):
+            analysis_pending.pop(key, None)
+            if not future.cancelled() and future.exception() is None:
+                analysis_cache.set(key, future.result())
+        
+        pending.add_done_callback(finish)
+    return await asyncio.shield(pending), False
+
+def mirror_square(sq: int) -> int:
+    row, col = divmod(sq, rules.BOARD_SIZE)
+    return row * rules.BOARD_SIZE + rules.BOARD_SIZE - 1 - col
+
+def legal_move(from_sq: int, to_sq: int) -> LegalMove:
+    from_row, from_col = divmod(from_sq, rules.BOARD_SIZE)
+    to_row, to_col = divmod(to_sq, rules.BOARD_SIZE)
+    return LegalMove(from_pos=Position(row=from_row, col=from_col), to_pos=Position(row=to_row, col=to_col))
+
+@api_router.post("/analyze", response_model=AnalysisResponse)
+async def analyze(request: AnalyzeRequest):
+    """Evaluation, best move and principal variation of any position, shared with its mirror image"""
+    if len(request.board) != rules.BOARD_SIZE or any(len(row) != rules.BOARD_SIZE for row in request.board):
+        raise HTTPException(status_code=400, detail="Board must be 5x5")
+    if request.player not in (1, 2) or any(cell and cell.player not in (1, 2) for row in request.board for cell in row):
+        raise HTTPException(status_code=400, detail="Players are numbered 1 and 2")
+    bitboard = rules.from_board(request.board)
+    if (bitboard.kings & bitboard.p1).bit_count() != 1 or (bitboard.kings & bitboard.p2).bit_count() != 1:
+        raise HTTPException(status_code=400, detail="Each player needs exactly one king")
+    
+    key = tablebase.canonical_key(bitboard, request.player)
+    # Results are stored for the canonical orientation; map squares back if the request is its mirror
+    mirrored = key != tablebase.pack(bitboard, request.player)
+    result, cached = await analyze_canonical(key)
+    
+    def to_move(move: engine.Move) -> LegalMove:
+        frm, to = move
+        return legal_move(mirror_square(frm), mirror_square(to)) if mirrored else legal_move(frm, to)
+    
+    score = result.score
+    winner = rules.winner(bitboard)
+    if winner is not None:
+        score = engine.WIN_SCORE if winner == request.player else -engine.WIN_SCORE
+    elif result.move is None:
+        score = -engine.WIN_SCORE  # no legal move loses
+    analysis = AnalysisResponse(
+        player=request.player,
+        score=score,
+        depth=result.depth,
+        best_move=to_move(result.move) if result.move else None,
+        pv=[to_move(move) for move in result.pv],
+        cached=cached,
+    )
+    if abs(score) > engine.WIN_THRESHOLD:
+        analysis.result = "win" if score > 0 else "loss"
+        analysis.distance = engine.WIN_SCORE - abs(score)
+    return analysis
+
+@api_router.get("/book", response_model=BookResponse)
+async def get_book(position: str = rules.to_string(rules.INITIAL_BITBOARD), player: int = 1):
+    """Moves played from a position (rules.to_string board) in finished games, most played first"""
+    try:
+        bitboard = rules.from_string(position)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if player not in (1, 2) or not (bitboard.kings & bitboard.p1 and bitboard.kings & bitboard.p2):
+        raise HTTPException(status_code=400, detail="Position needs both kings and player 1 or 2 to move")
+    
+    entries = []
+    for move in opening_book.moves(bitboard, player):
+        squares = legal_move(move.from_sq, move.to_sq)
+        entries.append(BookEntry(
+            from_pos=squares.from_pos,
+            to_pos=squares.to_pos,
+            games=move.games,
+            wins=move.wins,
+            win_rate=move.win_rate,
+        ))
+    return BookResponse(position=position, player=player, moves=entries)
 
 @api_router.post("/game/move")
 async def make_move(request: MakeMoveRequest):
     """Make a move in the game"""
-    game_doc = await db.games.find_one({"id": request.game_id})
-    if not game_doc:
+    for _ in range(WRITE_RETRIES):
+        try:
+            return await apply_move_request(request)
+        except WriteConflict:
+            continue
+    raise HTTPException(status_code=409, detail="Game was updated concurrently, please retry")
+
+async def apply_move_request(request: MakeMoveRequest) -> Dict[str, Any]:
+    """Read, validate and conditionally write one move attempt"""
+    cached = await load_game(request.game_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    game = Game(**game_doc)
+    game = cached.model_copy(deep=True)
     
     if game.status != GameStatus.IN_PROGRESS:
         raise HTTPException(status_code=400, detail="Game is not in progress")
@@ -262,47 +1032,94 @@ async def make_move(request: MakeMoveRequest):
         raise HTTPException(status_code=400, detail="Not your turn")
     
     # Validate move
-    from_pos = Position(row=request.from_row, col=request.from_col)
-    to_pos = Position(row=request.to_row, col=request.to_col)
+    bitboard = rules.from_board(game.game_state.board)
+    from_sq = rules.square(request.from_row, request.from_col)
+    to_sq = rules.square(request.to_row, request.to_col)
     
-    if not is_valid_move(game.game_state.board, from_pos, to_pos, player.player_number):
+    if not rules.is_legal(bitboard, player.player_number, from_sq, to_sq):
         raise HTTPException(status_code=400, detail="Invalid move")
     
-    # Make the move
-    piece = game.game_state.board[request.from_row][request.from_col]
-    game.game_state.board[request.from_row][request.from_col] = None
-    game.game_state.board[request.to_row][request.to_col] = piece
-    
-    # Record the move
-    move = Move(from_pos=from_pos, to_pos=to_pos, player=player.player_number)
-    game.game_state.moves.append(move)
+    moves_before = len(game.game_state.moves)
+    bitboard = play_move(game, bitboard, from_sq, to_sq, player.player_number)
     
-    # Check for winner
-    winner = check_winner(game.game_state.board)
-    if winner:
-        game.game_state.winner = winner
-        game.status = GameStatus.FINISHED
-    else:
-        # Switch turns
-        game.game_state.current_player = 3 - game.game_state.current_player
+    # Let the engine reply within the same request
+    engine_move = None
+    engine_player = next(
+        (p for p in game.players if p.is_engine and p.player_number == game.game_state.current_player),
+        None
+    )
+    if game.status == GameStatus.IN_PROGRESS and engine_player:
+        reply = None
+        if len(game.game_state.moves) < opening_book.plies:
+            book_move = opening_book.best_move(bitboard, engine_player.player_number, BOOK_MIN_GAMES)
+            # A corrupt or foreign book file must not make the engine play an illegal move
+            if book_move and rules.is_legal(bitboard, engine_player.player_number, book_move.from_sq, book_move.to_sq):
+                reply = (book_move.from_sq, book_move.to_sq)
+        if reply is None:
+            result = await asyncio.get_running_loop().run_in_executor(
+                engine_executor, engine.search, bitboard, engine_player.player_number, ENGINE_TIME_BUDGET
+            )
+            reply = result.move
+        if reply:
+            engine_from, engine_to = reply
+            bitboard = play_move(game, bitboard, engine_from, engine_to, engine_player.player_number)
+            engine_move = game.game_state.moves[-1]
     
+    winner = game.game_state.winner
+    read_version = game.version
+    game.version += 1
     game.updated_at = datetime.utcnow()
     
-    await db.games.update_one(
-        {"_id": game_doc["_id"]},
-        {"$set": game.dict()}
-    )
+    await conditional_update(game.id, read_version, move_update(game, game.game_state.moves[moves_before:]))
+    remember_game(game)
+    await publish_game_update(game)
+    if game.status == GameStatus.FINISHED:
+        opening_book.add_game(game_squares(game), winner)
     
-    return {"success": True, "winner": winner}
+    return {"success": True, "winner": winner, "engine_move": engine_move}
+
+@api_router.websocket("/game/{game_id}/ws")
+async def game_updates(websocket: WebSocket, game_id: str):
+    """Push the game state to players and watchers whenever it changes"""
+    # Subscribe before reading, so a move committed while the game loads is still pushed
+    await game_connections.connect(game_id, websocket)
+    try:
+        game = await load_game(game_id)
+        if not game:
+            await websocket.close(code=4404)
+            return
+        await game_connections.send_snapshot(websocket, game)
+        # Clients only listen; drain anything they send until they leave
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        game_connections.disconnect(game_id, websocket)
 
 @api_router.get("/game/room/{room_code}", response_model=Game)
 async def get_game_by_room(room_code: str):
     """Get game by room code"""
-    game_doc = await db.games.find_one({"room_code": room_code})
-    if not game_doc:
+    game = await load_game_by_room(room_code)
+    if not game:
         raise HTTPException(status_code=404, detail="Game room not found")
     
-    return Game(**game_doc)
+    return game
+
+@api_router.get("/lobby", response_model=LobbyPage)
+async def get_lobby(cursor: Optional[str] = None, limit: int = LOBBY_PAGE_SIZE):
+    """Open rooms waiting for a second player, newest first"""
+    return open_lobby.page(cursor, min(max(limit, 1), LOBBY_PAGE_MAX))
+
+@api_router.get("/metrics/cache")
+async def get_cache_metrics():
+    """Hit-rate and occupancy of the in-process game cache"""
+    return {
+        **game_cache.stats(),
+        "rooms": len(room_games),
+        "response_bodies": response_bodies.stats(),
+        "analysis": analysis_cache.stats(),
+    }
 # Legacy endpoints (keeping for compatibility)
 @api_router.get("/")
 async def root():
@@ -315,11 +1132,96 @@ async def create_status_check(input: StatusCheckCreate):
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
+async def ndjson_stream(cursor, batch_size: int = STREAM_BATCH_SIZE,
+                       transform: Optional[Callable[[Dict[str, Any]], Any]] = None) -> AsyncIterator[bytes]:
+    """One JSON line per document, written a cursor batch at a time so memory stays flat"""
+    lines = []
+    async for doc in cursor.batch_size(batch_size):
+        lines.append(orjson.dumps(transform(doc) if transform else doc))
+        if len(lines) == batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+async def get_status_checks(after: Optional[str] = None, limit: Optional[int] = None,
+                            output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$")):
+    """Status checks ordered by id; page with ?after=<last id>, or stream all of them with ?format=ndjson"""
+    query = {"id": {"$gt": after}} if after else {}
+    cursor = db.status_checks.find(query, {"_id": 0}).sort("id", ASCENDING)
+    if output_format == "ndjson":
+        if limit:
+            cursor = cursor.limit(limit)
+        return StreamingResponse(ndjson_stream(cursor), media_type="application/x-ndjson")
+    
+    limit = min(max(limit or STATUS_PAGE_SIZE, 1), STATUS_PAGE_MAX)
+    status_checks = await cursor.limit(limit).to_list(limit)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
+EXPORT_PROJECTION = {
+    "_id": 0, "id": 1, "room_code": 1, "status": 1, "schema": 1, "created_at": 1, "updated_at": 1,
+    "players.name": 1, "players.player_number": 1, "players.is_engine": 1,
+    "game_state.winner": 1, "game_state.moves": 1,
+}
+
+def export_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Replay record for a stored game of any schema; moves use the API's Move shape"""
+    state = doc["game_state"]
+    moves = state.get("moves", [])
+    if doc.get("schema", 1) >= GAME_SCHEMA_VERSION:
+        moves = [stored_move_json(packed, doc["created_at"]) for packed in moves]
+    return {
+        "id": doc["id"],
+        "room_code": doc["room_code"],
+        "status": doc["status"],
+        "players": [
+            {"name": player["name"], "player_number": player["player_number"], "is_engine": player.get("is_engine", False)}
+            for player in doc.get("players", [])
+        ],
+        "winner": state.get("winner"),
+        "created_at": doc["created_at"],
+        "updated_at": doc["updated_at"],
+        "moves": moves,
+    }
+
+async def export_stream(query: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """Matching live games, then matching archived ones, both in updated_at order"""
+    live = db.games.find(query, EXPORT_PROJECTION).sort("updated_at", ASCENDING)
+    async for chunk in ndjson_stream(live, EXPORT_BATCH_SIZE, export_record):
+        yield chunk
+    archived = db.games_archive.find(query, {"_id": 0, "data": 1}).sort("updated_at", ASCENDING)
+    async for chunk in ndjson_stream(archived, EXPORT_BATCH_SIZE, lambda entry: export_record(archive.unpack_archived(entry))):
+        yield chunk
+
+@api_router.get("/games/export")
+async def export_games(since: Optional[datetime] = None, status: GameStatus = GameStatus.FINISHED):
+    """Stream every game in status last updated at or after since as NDJSON"""
+    # A game archived while the export runs can appear twice; records carry their id
+    query: Dict[str, Any] = {"status": status.value}
+    if since is not None:
+        query["updated_at"] = {"$gte": since}
+    return StreamingResponse(export_stream(query), media_type="application/x-ndjson")
+
+@api_router.post("/games/import")
+async def import_games(request: Request, skip: int = 0):
+    """Replay and insert an NDJSON body of game records; after an interruption resend with ?skip=<lines>"""
+    # The body is read only as fast as batches are written, so a fast uploader is held back by TCP
+    stats = ingest.ImportStats(skip)
+    try:
+        await ingest.ingest(
+            ingest.batched_lines(request.stream(), IMPORT_BATCH_SIZE, skip),
+            db.games,
+            lambda lines: asyncio.to_thread(ingest.convert_lines, lines),
+            max_in_flight=IMPORT_IN_FLIGHT,
+            stats=stats,
+        )
+    except Exception as error:
+        # Hand back the checkpoint so the client can resend from stats.lines
+        logger.exception("Import failed after line %d", stats.lines)
+        raise HTTPException(status_code=500, detail={"error": str(error) or type(error).__name__, **stats.as_dict()})
+    return stats.as_dict()
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -338,6 +1240,128 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Indexes backing every hot query on db.games
+GAME_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    # Room codes are only reserved while a game is open
+    IndexModel(
+        [("room_code", ASCENDING)],
+        name="room_code_open_unique",
+        unique=True,
+        partialFilterExpression={"status": {"$in": [GameStatus.WAITING.value, GameStatus.IN_PROGRESS.value]}},
+    ),
+    IndexModel([("room_code", ASCENDING), ("status", ASCENDING)], name="room_code_status"),
+    IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+]
+
+# Representative filters of the queries that must never scan the collection
+HOT_GAME_QUERIES = [
+    {"id": ""},
+    {"room_code": "", "status": GameStatus.WAITING.value},
+    {"room_code": "", "status": {"$in": OPEN_STATUSES}},
+    {"room_code": ""},
+    {"status": GameStatus.WAITING.value},
+    archive.archivable_filter(datetime.utcnow()),
+]
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Every stage name in an explain() plan tree"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+async def ensure_indexes():
+    """Create the games indexes and fail if a hot query would still scan the collection"""
+    await db.games.create_indexes(GAME_INDEXES)
+    await db.games_archive.create_indexes(archive.ARCHIVE_INDEXES)
+    await db.status_checks.create_indexes([IndexModel([("id", ASCENDING)], name="id")])
+    
+    for query in HOT_GAME_QUERIES:
+        explain = await db.games.find(query).limit(1).explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            raise RuntimeError(f"Query {query} on db.games falls back to a collection scan: {stages}")
+
+def forget_archived(doc: Dict[str, Any]):
+    forget_game(doc["id"])
+    open_lobby.remove(doc["id"])
+
+async def load_open_rooms() -> List[LobbyRoom]:
+    """Every waiting room, read through the status index"""
+    cursor = db.games.find(
+        {"status": GameStatus.WAITING.value},
+        {"_id": 0, "id": 1, "room_code": 1, "players.name": 1, "created_at": 1}
+    )
+    return [
+        LobbyRoom(game_id=doc["id"], room_code=doc["room_code"], host=doc["players"][0]["name"],
+                  created_at=doc["created_at"])
+        async for doc in cursor
+        if doc.get("players")
+    ]
+
+async def resync_lobby():
+    while True:
+        await asyncio.sleep(LOBBY_RESYNC_INTERVAL)
+        try:
+            await open_lobby.rebuild(load_open_rooms)
+        except Exception:
+            logger.exception("Resyncing the lobby failed")
+
+async def save_book_periodically():
+    while True:
+        await asyncio.sleep(BOOK_SAVE_INTERVAL)
+        if opening_book.pending_games:
+            try:
+                await asyncio.to_thread(opening_book.save, BOOK_PATH)
+            except Exception:
+                logger.exception("Saving the opening book failed")
+
+archiver_task: Optional[asyncio.Task] = None
+lobby_task: Optional[asyncio.Task] = None
+book_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes()
+    logger.info("Game indexes verified for %d hot queries", len(HOT_GAME_QUERIES))
+
+@app.on_event("startup")
+async def load_lobby():
+    global lobby_task
+    await open_lobby.rebuild(load_open_rooms)
+    logger.info("Lobby loaded with %d open rooms", len(open_lobby.rooms))
+    if LOBBY_RESYNC_INTERVAL > 0:
+        lobby_task = asyncio.create_task(resync_lobby())
+
+@app.on_event("startup")
+async def start_archiver():
+    global archiver_task
+    if ARCHIVE_INTERVAL > 0:
+        archiver_task = asyncio.create_task(archive.run_archiver(
+            db.games, db.games_archive, ARCHIVE_INTERVAL, ARCHIVE_ABANDONED_AFTER, ARCHIVE_BATCH_SIZE,
+            on_archived=forget_archived,
+        ))
+
+@app.on_event("startup")
+async def start_book_saver():
+    global book_task
+    logger.info("Opening book loaded with %d position moves", len(opening_book.records))
+    if BOOK_SAVE_INTERVAL > 0:
+        book_task = asyncio.create_task(save_book_periodically())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in (archiver_task, lobby_task, book_task):
+        if task is not None:
+            task.cancel()
+    if opening_book.pending_games:
+        opening_book.save(BOOK_PATH)
     client.close()
+    engine_executor.shutdown(wait=False, cancel_futures=True)
+    analysis_executor.shutdown(wait=False, cancel_futures=True)
+    if solved_positions is not None:
+        solved_positions.close()
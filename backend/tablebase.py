@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Retrograde-analysis tablebase for King's Valley.
+
+Without captures every position keeps all ten pieces, so the full game has
+roughly 2 * 10^10 positions; the builder therefore solves the positions
+reachable within ``--plies`` of ``initialize_board()``. Left-right mirror
+images share one entry. Wins are always proven; losses are proven only when
+every reply stays inside the analysed set, and draws only when the set is
+closed. Anything else is left out and probes return ``None``.
+
+The output is an open-addressing hash table that the API process mmaps, so
+every worker shares one page-cache copy and a probe is O(1).
+
+Build with ``python tablebase.py build --plies 6 --output kings_valley.kvtb``.
+"""
+
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import typer
+
+import rules
+
+MAGIC = b"KVTBASE1"
+HEADER = struct.Struct("<8sIIQ")  # magic, slot bits, plies analysed, entry count
+SLOT = struct.Struct("<QH")  # canonical key, packed value
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK_25 = (1 << rules.NUM_SQUARES) - 1
+MASK_64 = (1 << 64) - 1
+
+# Results are from the point of view of the side to move
+WIN, LOSS, DRAW = 1, 2, 3
+RESULT_NAMES = {WIN: "win", LOSS: "loss", DRAW: "draw"}
+DISTANCE_BITS = 14
+
+_MIRROR_ROW = tuple(int(f"{i:05b}"[::-1], 2) for i in range(32))
+
+
+class TablebaseEntry(NamedTuple):
+    result: int
+    distance: int  # plies to the end of the game with perfect play
+
+    @property
+    def name(self) -> str:
+        return RESULT_NAMES[self.result]
+
+
+def mirror(bb: rules.Bitboard) -> rules.Bitboard:
+    """Left-right mirror image of a position"""
+    def flip(mask: int) -> int:
+        out = 0
+        for shift in range(0, rules.NUM_SQUARES, rules.BOARD_SIZE):
+            out |= _MIRROR_ROW[(mask >> shift) & 31] << shift
+        return out
+    return rules.Bitboard(flip(bb.p1), flip(bb.p2), flip(bb.kings))
+
+
+def pack(bb: rules.Bitboard, player: int) -> int:
+    """Pack a position into 61 bits: both occupancy masks, both king squares and the side to move"""
+    king1 = (bb.kings & bb.p1).bit_length() - 1
+    king2 = (bb.kings & bb.p2).bit_length() - 1
+    return bb.p1 | (bb.p2 << 25) | (king1 << 50) | (king2 << 55) | ((player - 1) << 60)
+
+
+def unpack(key: int) -> Tuple[rules.Bitboard, int]:
+    """Inverse of pack"""
+    kings = (1 << ((key >> 50) & 31)) | (1 << ((key >> 55) & 31))
+    return rules.Bitboard(key & MASK_25, (key >> 25) & MASK_25, kings), (key >> 60) + 1
+
+
+def canonical_key(bb: rules.Bitboard, player: int) -> int:
+    """Packed key shared by a position and its mirror image"""
+    return min(pack(bb, player), pack(mirror(bb), player))
+
+
+def successor_keys(key: int) -> List[int]:
+    """Canonical keys of every position reachable in one move, empty if the game is over"""
+    bb, player = unpack(key)
+    if rules.winner(bb) is not None:
+        return []
+    opponent = 3 - player
+    return [canonical_key(rules.apply_move(bb, frm, to), opponent) for frm, to in rules.legal_moves(bb, player)]
+
+
+def _is_terminal(key: int) -> bool:
+    """Whether either king of a packed position stands on the centre square"""
+    return ((key >> 50) & 31) == rules.CENTER or ((key >> 55) & 31) == rules.CENTER
+
+
+def _slot_index(key: int, slot_bits: int) -> int:
+    return ((key * HASH_MULTIPLIER) & MASK_64) >> (64 - slot_bits)
+
+
+def encode_value(entry: TablebaseEntry) -> int:
+    return (entry.result << DISTANCE_BITS) | entry.distance
+
+
+def decode_value(value: int) -> TablebaseEntry:
+    return TablebaseEntry(value >> DISTANCE_BITS, value & ((1 << DISTANCE_BITS) - 1))
+
+
+class Tablebase:
+    """Read-only, memory-mapped tablebase"""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slot_bits, self.plies, self.entries = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a King's Valley tablebase")
+        self._slot_mask = (1 << self.slot_bits) - 1
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def probe(self, bb: rules.Bitboard, player: int) -> Optional[TablebaseEntry]:
+        """Perfect-play result for player to move, or None if the position was not solved"""
+        key = canonical_key(bb, player)
+        index = _slot_index(key, self.slot_bits)
+        while True:
+            stored, value = SLOT.unpack_from(self._mmap, HEADER.size + index * SLOT.size)
+            if stored == key:
+                return decode_value(value)
+            if stored == 0:
+                return None
+            index = (index + 1) & self._slot_mask
+
+    def best_move(self, bb: rules.Bitboard, player: int) -> Optional[Tuple[Tuple[int, int], TablebaseEntry]]:
+        """Best solved move for player and the resulting outcome for them, or None"""
+        best = None
+        best_rank = None
+        for frm, to in rules.legal_moves(bb, player):
+            reply = self.probe(rules.apply_move(bb, frm, to), 3 - player)
+            # Prefer the fastest win, then a draw, then an unsolved move, then the slowest loss
+            if reply is None:
+                rank = (1, 0)
+                outcome = None
+            elif reply.result == LOSS:
+                rank = (3, -reply.distance)
+                outcome = TablebaseEntry(WIN, reply.distance + 1)
+            elif reply.result == DRAW:
+                rank = (2, 0)
+                outcome = TablebaseEntry(DRAW, 0)
+            else:
+                rank = (0, reply.distance)
+                outcome = TablebaseEntry(LOSS, reply.distance + 1)
+            if best_rank is None or rank > best_rank:
+                best_rank = rank
+                best = ((frm, to), outcome)
+        if best is None or best[1] is None:
+            return None
+        return best
+
+
+def open_tablebase(path: Optional[str]) -> Optional[Tablebase]:
+    """Open the tablebase at path if it exists"""
+    if not path or not Path(path).is_file():
+        return None
+    return Tablebase(Path(path))
+
+
+# Builder. Worker processes are forked after _VALUES is set so they read it copy-on-write.
+
+_VALUES: Dict[int, TablebaseEntry] = {}
+
+
+def _expand(keys: List[int]) -> List[int]:
+    children = []
+    for key in keys:
+        children.extend(successor_keys(key))
+    return children
+
+
+def _resolve(keys: List[int]) -> List[Tuple[int, TablebaseEntry]]:
+    """One retrograde pass: resolve positions whose successors are now decided"""
+    values = _VALUES
+    updates = []
+    for key in keys:
+        children = successor_keys(key)
+        if not children:
+            # Opponent king on the centre, or no legal move: the side to move has lost
+            updates.append((key, TablebaseEntry(LOSS, 0)))
+            continue
+        fastest_win = None
+        slowest_loss = 0
+        all_win = True
+        for child in children:
+            entry = values.get(child)
+            if entry is None and _is_terminal(child):
+                # Terminal successors beyond the analysed horizon
+                entry = TablebaseEntry(LOSS, 0)
+            if entry is None or entry.result != WIN:
+                all_win = False
+            if entry is None:
+                continue
+            if entry.result == LOSS:
+                if fastest_win is None or entry.distance < fastest_win:
+                    fastest_win = entry.distance
+            elif entry.result == WIN:
+                slowest_loss = max(slowest_loss, entry.distance)
+        if fastest_win is not None:
+            updates.append((key, TablebaseEntry(WIN, fastest_win + 1)))
+        elif all_win:
+            updates.append((key, TablebaseEntry(LOSS, slowest_loss + 1)))
+    return updates
+
+
+def _chunks(items: List[int], count: int) -> Iterable[List[int]]:
+    size = max(1, -(-len(items) // count))
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def enumerate_positions(plies: int, processes: int) -> Tuple[List[int], bool]:
+    """Canonical keys reachable within plies of the initial position, and whether the set is closed"""
+    start_key = canonical_key(rules.INITIAL_BITBOARD, 1)
+    seen = {start_key}
+    layer = [start_key]
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes) as pool:
+        for _ in range(plies):
+            new = []
+            for children in pool.imap_unordered(_expand, _chunks(layer, processes * 4)):
+                for child in children:
+                    if child not in seen:
+                        seen.add(child)
+                        new.append(child)
+            if not new:
+                return list(seen), True
+            layer = new
+    return list(seen), False
+
+
+def solve(keys: List[int], closed: bool, processes: int) -> Dict[int, TablebaseEntry]:
+    """Retrograde passes until no position changes"""
+    global _VALUES
+    _VALUES = {}
+    pending = keys
+    ctx = multiprocessing.get_context("fork")
+    while pending:
+        with ctx.Pool(processes) as pool:
+            updates = [u for batch in pool.imap_unordered(_resolve, _chunks(pending, processes * 4)) for u in batch]
+        if not updates:
+            break
+        _VALUES.update(updates)
+        pending = [key for key in pending if key not in _VALUES]
+    if closed:
+        # In a closed set anything unresolved can cycle forever
+        for key in pending:
+            _VALUES[key] = TablebaseEntry(DRAW, 0)
+    return _VALUES
+
+
+def write_tablebase(path: Path, values: Dict[int, TablebaseEntry], plies: int) -> None:
+    """Write values as an open-addressing table at most half full"""
+    slot_bits = max(4, (len(values) * 2).bit_length())
+    slots = 1 << slot_bits
+    mask = slots - 1
+    buffer = bytearray(HEADER.size + slots * SLOT.size)
+    HEADER.pack_into(buffer, 0, MAGIC, slot_bits, plies, len(values))
+    for key, entry in values.items():
+        index = _slot_index(key, slot_bits)
+        while SLOT.unpack_from(buffer, HEADER.size + index * SLOT.size)[0]:
+            index = (index + 1) & mask
+        SLOT.pack_into(buffer, HEADER.size + index * SLOT.size, key, encode_value(entry))
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(buffer)
+    os.replace(tmp_path, path)
+
+
+app = typer.Typer(help="King's Valley tablebase tools")
+
+
+@app.command()
+def build(
+    output: Path = typer.Option(Path("kings_valley.kvtb"), help="Tablebase file to write"),
+    plies: int = typer.Option(6, help="Analyse positions up to this many plies from the start"),
+    processes: int = typer.Option(os.cpu_count() or 1, help="Worker processes"),
+):
+    """Enumerate, solve and write the tablebase"""
+    started = time.perf_counter()
+    keys, closed = enumerate_positions(plies, processes)
+    typer.echo(f"{len(keys)} positions within {plies} plies ({'closed' if closed else 'open'} set)")
+    values = solve(keys, closed, processes)
+    counts = {name: sum(1 for v in values.values() if v.result == result) for result, name in RESULT_NAMES.items()}
+    typer.echo(f"solved {len(values)}: {counts}")
+    write_tablebase(output, values, plies)
+    typer.echo(f"wrote {output} in {time.perf_counter() - started:.1f}s")
+
+
+@app.command()
+def probe(path: Path, board: str = typer.Argument(..., help="25-character board string, see rules.to_string"),
+          player: int = 1):
+    """Look up a single position"""
+    entry = Tablebase(path).probe(rules.from_string(board), player)
+    typer.echo("unknown" if entry is None else f"{entry.name} in {entry.distance}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Self-play tournament runner
+
+Plays games between two agents across a process pool using the in-process
+rules core, streams one JSON line per game to disk and reports Elo, win rates
+by side and throughput. Agents are ``random``, ``engine:<ms>`` (time budget
+per move) or ``depth:<n>`` (fixed search depth).
+
+Example: ``python tournament.py --player-a engine:20 --player-b random --games 2000``
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import typer
+
+import engine
+import rules
+
+MAX_PLIES = 200
+
+Agent = Callable[[rules.Bitboard, int], Optional[Tuple[int, int]]]
+
+
+class GameResult(NamedTuple):
+    game: int
+    player_1: str
+    player_2: str
+    winner: Optional[int]
+    plies: int
+    seconds: float
+
+
+def make_agent(spec: str, seed: int) -> Agent:
+    """Build a move-picking function from an agent spec"""
+    kind, _, arg = spec.partition(":")
+    if kind == "random":
+        rng = random.Random(seed)
+
+        def pick_random(bb: rules.Bitboard, player: int) -> Optional[Tuple[int, int]]:
+            moves = rules.legal_moves(bb, player)
+            return rng.choice(moves) if moves else None
+        return pick_random
+    if kind in ("engine", "depth"):
+        table = engine.TranspositionTable(size_bits=14)
+        budget = int(arg or 100) / 1000 if kind == "engine" else 3600.0
+        max_depth = int(arg or 3) if kind == "depth" else engine.MAX_DEPTH
+
+        def pick_search(bb: rules.Bitboard, player: int) -> Optional[Tuple[int, int]]:
+            return engine.search(bb, player, budget, max_depth=max_depth, table=table).move
+        return pick_search
+    raise typer.BadParameter(f"Unknown agent {spec!r}")
+
+
+def play_game(args: Tuple[int, str, str, int]) -> GameResult:
+    """Play one game; the first spec moves first"""
+    index, spec_1, spec_2, seed = args
+    agents = {1: make_agent(spec_1, seed), 2: make_agent(spec_2, seed + 1)}
+    started = time.perf_counter()
+    bb = rules.INITIAL_BITBOARD
+    player = 1
+    winner = None
+    plies = 0
+    while plies < MAX_PLIES:
+        move = agents[player](bb, player)
+        if move is None:
+            # A player who cannot move has lost
+            winner = 3 - player
+            break
+        bb = rules.apply_move(bb, *move)
+        plies += 1
+        winner = rules.winner(bb)
+        if winner:
+            break
+        player = 3 - player
+    return GameResult(index, spec_1, spec_2, winner, plies, time.perf_counter() - started)
+
+
+def elo_difference(score: float) -> float:
+    """Elo difference implied by an expected score in (0, 1)"""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+app = typer.Typer(help="King's Valley self-play tournaments")
+
+
+@app.command()
+def run(
+    player_a: str = typer.Option("engine:20", help="Agent spec for A"),
+    player_b: str = typer.Option("random", help="Agent spec for B"),
+    games: int = typer.Option(1000, min=1, help="Games to play; sides alternate"),
+    processes: int = typer.Option(os.cpu_count() or 1, min=1, help="Worker processes"),
+    output: Path = typer.Option(Path("tournament.ndjson"), help="One JSON line per finished game"),
+    seed: int = typer.Option(0, help="Base seed for random agents"),
+):
+    """Play A against B and report Elo, win rates by side and throughput"""
+    jobs = [
+        (i, player_a, player_b, seed + 2 * i) if i % 2 == 0 else (i, player_b, player_a, seed + 2 * i)
+        for i in range(games)
+    ]
+    points = {player_a: 0.0, player_b: 0.0}
+    side_wins: Dict[int, int] = {1: 0, 2: 0}
+    draws = 0
+    plies = 0
+    cpu_seconds = 0.0
+
+    started = time.perf_counter()
+    with open(output, "w") as out, multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, jobs, chunksize=max(1, games // (processes * 16))):
+            out.write(json.dumps(result._asdict()) + "\n")
+            plies += result.plies
+            cpu_seconds += result.seconds
+            if result.winner is None:
+                draws += 1
+                points[player_a] += 0.5
+                points[player_b] += 0.5
+                continue
+            side_wins[result.winner] += 1
+            winner_spec = result.player_1 if result.winner == 1 else result.player_2
+            if player_a == player_b:
+                points[player_a] += 0.5
+                points[player_b] += 0.5
+            else:
+                points[winner_spec] += 1
+    elapsed = time.perf_counter() - started
+
+    score = points[player_a] / games
+    typer.echo(f"{games} games in {elapsed:.1f}s -> {output}")
+    typer.echo(f"A={player_a} scored {points[player_a]:.1f}, B={player_b} scored {points[player_b]:.1f}")
+    typer.echo(f"Elo(A - B): {elo_difference(score):+.0f}")
+    typer.echo(
+        f"player 1 wins {side_wins[1] / games:.1%}, player 2 wins {side_wins[2] / games:.1%}, draws {draws / games:.1%}"
+    )
+    typer.echo(
+        f"{games / elapsed:.1f} games/s, {games / cpu_seconds if cpu_seconds else 0:.1f} games/s per core, "
+        f"{plies / cpu_seconds if cpu_seconds else 0:,.0f} plies/s per core"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -7,6 +7,7 @@ Tests all key functionalities of the King's Valley game backend API
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 
 # Backend URL from frontend/.env
@@ -408,6 +409,54 @@ class KingsValleyTester:
         self.log_test("Edge Cases", success, f"Passed {edge_cases_passed}/{total_edge_cases} edge case tests",
                     {"passed": edge_cases_passed, "total": total_edge_cases})
 
+    def test_concurrent_moves(self):
+        """Test concurrency - parallel moves against one game must apply exactly once"""
+        try:
+            create_response = self.session.post(f"{BACKEND_URL}/game/create", json={"player_name": "Racer1"})
+            game = create_response.json()["game"]
+            player1_id = game["players"][0]["id"]
+            self.session.post(f"{BACKEND_URL}/game/join", json={"room_code": game["room_code"], "player_name": "Racer2"})
+            
+            legal = self.session.get(f"{BACKEND_URL}/game/{game['id']}/legal-moves").json()["moves"]
+            # Every legal move twice, as if from double clicks and several tabs at once
+            payloads = [
+                {
+                    "game_id": game["id"],
+                    "player_id": player1_id,
+                    "from_row": move["from_pos"]["row"],
+                    "from_col": move["from_pos"]["col"],
+                    "to_row": move["to_pos"]["row"],
+                    "to_col": move["to_pos"]["col"]
+                }
+                for move in legal for _ in range(2)
+            ]
+            
+            def fire(payload):
+                return requests.post(f"{BACKEND_URL}/game/move", json=payload).status_code
+            
+            with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+                statuses = list(pool.map(fire, payloads))
+            
+            final = self.session.get(f"{BACKEND_URL}/game/{game['id']}").json()
+            accepted = statuses.count(200)
+            rejected_cleanly = all(status in (200, 400, 409) for status in statuses)
+            applied = len(final["game_state"]["moves"])
+            details = {
+                "requests": len(statuses),
+                "accepted": accepted,
+                "statuses": sorted(set(statuses)),
+                "moves_applied": applied,
+                "version": final.get("version")
+            }
+            
+            if accepted == 1 and applied == 1 and rejected_cleanly and final["game_state"]["current_player"] == 2:
+                self.log_test("Concurrent Moves", True, "Exactly one of the parallel moves was applied", details)
+            else:
+                self.log_test("Concurrent Moves", False, "Parallel moves were not serialized correctly", details)
+                
+        except Exception as e:
+            self.log_test("Concurrent Moves", False, f"Exception during concurrency test: {str(e)}")
+
     def run_all_tests(self):
         """Run all tests in sequence"""
         print("=" * 60)
@@ -424,6 +473,7 @@ class KingsValleyTester:
         self.test_invalid_move_validation()
         self.test_win_condition()
         self.test_edge_cases()
+        self.test_concurrent_moves()
         
         # Summary
         print("=" * 60)
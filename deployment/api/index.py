@@ -3,10 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional
 import uuid
 from datetime import datetime
-from enum import Enum
+
+# Copies of backend/models.py and backend/rules.py (yarn sync-rules), so both APIs accept the same moves
+from models import Board, GameStatus, Position, board_from_bitboard, initialize_board, square_of
+import rules
 
 # Environment variables
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -27,25 +30,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Game Enums
-class PieceType(str, Enum):
-    KING = "K"
-    PAWN = "P"
-
-class GameStatus(str, Enum):
-    WAITING = "waiting"
-    IN_PROGRESS = "in_progress"
-    FINISHED = "finished"
-
 # Game Models
-class Piece(BaseModel):
-    player: int
-    type: PieceType
-    
-class Position(BaseModel):
-    row: int
-    col: int
-
 class Move(BaseModel):
     from_pos: Position
     to_pos: Position
@@ -56,7 +41,7 @@ class Player(BaseModel):
     number: int
 
 class GameState(BaseModel):
-    board: List[List[Optional[Piece]]]
+    board: Board
     current_player: int
     winner: Optional[int] = None
 
@@ -70,74 +55,6 @@ class Game(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
-# Game Logic Functions
-def create_initial_board():
-    board = [[None for _ in range(5)] for _ in range(5)]
-    
-    # Player 1 pieces (bottom)
-    board[4][0] = Piece(player=1, type=PieceType.PAWN)
-    board[4][1] = Piece(player=1, type=PieceType.PAWN) 
-    board[4][2] = Piece(player=1, type=PieceType.KING)
-    board[4][3] = Piece(player=1, type=PieceType.PAWN)
-    board[4][4] = Piece(player=1, type=PieceType.PAWN)
-    
-    # Player 2 pieces (top)
-    board[0][0] = Piece(player=2, type=PieceType.PAWN)
-    board[0][1] = Piece(player=2, type=PieceType.PAWN)
-    board[0][2] = Piece(player=2, type=PieceType.KING)
-    board[0][3] = Piece(player=2, type=PieceType.PAWN)
-    board[0][4] = Piece(player=2, type=PieceType.PAWN)
-    
-    return board
-
-def is_valid_move(board: List[List[Optional[Piece]]], move: Move, current_player: int) -> bool:
-    from_row, from_col = move.from_pos.row, move.from_pos.col
-    to_row, to_col = move.to_pos.row, move.to_pos.col
-    
-    # Check bounds
-    if not (0 <= from_row < 5 and 0 <= from_col < 5 and 0 <= to_row < 5 and 0 <= to_col < 5):
-        return False
-    
-    # Check if there's a piece at the source
-    piece = board[from_row][from_col]
-    if not piece or piece.player != current_player:
-        return False
-    
-    # Check if destination is empty
-    if board[to_row][to_col] is not None:
-        return False
-    
-    # Check if it's a valid sliding move
-    row_diff = to_row - from_row
-    col_diff = to_col - from_col
-    
-    # Must move in straight line (horizontal, vertical, or diagonal)
-    if row_diff != 0 and col_diff != 0 and abs(row_diff) != abs(col_diff):
-        return False
-    
-    # Calculate direction
-    row_dir = 0 if row_diff == 0 else (1 if row_diff > 0 else -1)
-    col_dir = 0 if col_diff == 0 else (1 if col_diff > 0 else -1)
-    
-    # Check path is clear and piece slides until blocked
-    current_row, current_col = from_row + row_dir, from_col + col_dir
-    last_valid_row, last_valid_col = from_row, from_col
-    
-    while 0 <= current_row < 5 and 0 <= current_col < 5:
-        if board[current_row][current_col] is not None:
-            break
-        last_valid_row, last_valid_col = current_row, current_col
-        current_row += row_dir
-        current_col += col_dir
-    
-    return to_row == last_valid_row and to_col == last_valid_col
-
-def check_win_condition(board: List[List[Optional[Piece]]]) -> Optional[int]:
-    center_piece = board[2][2]
-    if center_piece and center_piece.type == PieceType.KING:
-        return center_piece.player
-    return None
-
 # API Endpoints
 @app.get("/")
 async def root():
@@ -147,7 +64,7 @@ async def root():
 async def create_game(player_name: str):
     player = Player(name=player_name, number=1)
     initial_state = GameState(
-        board=create_initial_board(),
+        board=initialize_board(),
         current_player=1
     )
     
@@ -208,16 +125,18 @@ async def make_move(game_id: str, move: Move):
     if game.status != GameStatus.IN_PROGRESS:
         raise HTTPException(status_code=400, detail="Game is not in progress")
     
-    if not is_valid_move(game.state.board, move, game.state.current_player):
+    bitboard = rules.from_board(game.state.board)
+    from_sq = square_of(move.from_pos)
+    to_sq = square_of(move.to_pos)
+    if not rules.is_legal(bitboard, game.state.current_player, from_sq, to_sq):
         raise HTTPException(status_code=400, detail="Invalid move")
     
     # Make the move
-    piece = game.state.board[move.from_pos.row][move.from_pos.col]
-    game.state.board[move.from_pos.row][move.from_pos.col] = None
-    game.state.board[move.to_pos.row][move.to_pos.col] = piece
+    bitboard = rules.apply_move(bitboard, from_sq, to_sq)
+    game.state.board = board_from_bitboard(bitboard)
     
-    # Check for win condition
-    winner = check_win_condition(game.state.board)
+    # Check for win condition, including an opponent left without a move
+    winner = rules.game_winner(bitboard, 3 - game.state.current_player)
     if winner:
         game.state.winner = winner
         game.status = GameStatus.FINISHED
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 import GameLobby from './GameLobby';
 import GameBoard from './GameBoard';
@@ -13,41 +13,89 @@ const GameContainer = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
   const [winner, setWinner] = useState(null);
+  const [legalMoves, setLegalMoves] = useState(null);
+
+  const [isLive, setIsLive] = useState(false);
+  const versionRef = useRef(0);
+
+  // Apply a {game, player, moves} payload from the API or the WebSocket
+  const applyGameUpdate = useCallback((data) => {
+    const updatedGame = data.game;
+    
+    versionRef.current = updatedGame.version ?? 0;
+    setGameState(updatedGame);
+    setLegalMoves(data.moves);
+    
+    // Check for winner
+    if (updatedGame.game_state.winner) {
+      setWinner(updatedGame.game_state.winner);
+    }
+  }, []);
 
   // Poll for game updates
   const fetchGameState = useCallback(async () => {
     if (!gameState?.id) return;
     
     try {
-      const response = await axios.get(`${API}/game/${gameState.id}`);
-      const updatedGame = response.data;
-      
-      setGameState(updatedGame);
-      
-      // Check for winner
-      if (updatedGame.game_state.winner) {
-        setWinner(updatedGame.game_state.winner);
-      }
+      const response = await axios.get(`${API}/game/${gameState.id}/legal-moves`);
+      applyGameUpdate(response.data);
     } catch (err) {
       console.error('Error fetching game state:', err);
     }
-  }, [gameState?.id]);
+  }, [gameState?.id, applyGameUpdate]);
 
-  // Poll every 2 seconds when game is active
+  // Receive pushed updates over a WebSocket while the game is open
   useEffect(() => {
-    if (gameState && gameState.status !== 'finished') {
-      const interval = setInterval(fetchGameState, 2000);
-      return () => clearInterval(interval);
-    }
-  }, [fetchGameState, gameState?.status]);
+    if (!gameState?.id) return;
+    
+    const socket = new WebSocket(`${API.replace(/^http/, 'ws')}/game/${gameState.id}/ws`);
+    socket.onopen = () => setIsLive(true);
+    socket.onmessage = (event) => applyGameUpdate(JSON.parse(event.data));
+    socket.onclose = () => setIsLive(false);
+    
+    return () => {
+      socket.onclose = null;
+      socket.close();
+      setIsLive(false);
+    };
+  }, [gameState?.id, applyGameUpdate]);
 
-  const handleCreateGame = async (playerName) => {
+  // Fall back to long-polling when the game is active and the socket is down
+  useEffect(() => {
+    if (!gameState?.id || gameState.status === 'finished' || isLive) return;
+    
+    let cancelled = false;
+    const waitForUpdates = async () => {
+      while (!cancelled) {
+        try {
+          const response = await axios.get(`${API}/game/${gameState.id}/wait`, {
+            params: { since: versionRef.current }
+          });
+          // 204 means nothing changed before the server timeout
+          if (!cancelled && response.status === 200) {
+            applyGameUpdate(response.data);
+          }
+        } catch (err) {
+          console.error('Error waiting for game updates:', err);
+          await new Promise(resolve => setTimeout(resolve, 2000));
+        }
+      }
+    };
+    waitForUpdates();
+    
+    return () => {
+      cancelled = true;
+    };
+  }, [gameState?.id, gameState?.status, isLive, applyGameUpdate]);
+
+  const handleCreateGame = async (playerName, vsEngine = false) => {
     setIsLoading(true);
     setError('');
     
     try {
       const response = await axios.post(`${API}/game/create`, {
-        player_name: playerName
+        player_name: playerName,
+        vs_engine: vsEngine
       });
       
       const data = response.data;
@@ -65,6 +113,14 @@ const GameContainer = () => {
     }
   };
 
+  // One page of open rooms, newest first; pass back next_cursor for older rooms
+  const fetchOpenRooms = useCallback(async (cursor = null) => {
+    const response = await axios.get(`${API}/lobby`, {
+      params: cursor ? { cursor, limit: 10 } : { limit: 10 }
+    });
+    return response.data;
+  }, []);
+
   const handleJoinGame = async (roomCode, playerName) => {
     setIsLoading(true);
     setError('');
@@ -110,6 +166,16 @@ const GameContainer = () => {
         return;
       }
       
+      // Skip the round trip for moves the server already told us are illegal
+      if (legalMoves && !legalMoves.some(m =>
+        m.from_pos.row === selectedSquare.row && m.from_pos.col === selectedSquare.col &&
+        m.to_pos.row === row && m.to_pos.col === col
+      )) {
+        setError('Invalid move. Please try a different move.');
+        setTimeout(() => setError(''), 3000);
+        return;
+      }
+      
       // Try to move the piece
       try {
         const response = await axios.post(`${API}/game/move`, {
@@ -123,6 +189,7 @@ const GameContainer = () => {
         
         if (response.data.success) {
           setSelectedSquare(null);
+          setLegalMoves(null);
           if (response.data.winner) {
             setWinner(response.data.winner);
           }
@@ -151,6 +218,7 @@ const GameContainer = () => {
     setPlayerInfo(null);
     setSelectedSquare(null);
     setWinner(null);
+    setLegalMoves(null);
     setError('');
   };
 
@@ -160,6 +228,7 @@ const GameContainer = () => {
         <GameLobby 
           onCreateGame={handleCreateGame}
           onJoinGame={handleJoinGame}
+          onFetchRooms={fetchOpenRooms}
           isLoading={isLoading}
         />
         {error && (
@@ -1,15 +1,39 @@
-import React, { useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 
-const GameLobby = ({ onCreateGame, onJoinGame, isLoading }) => {
+const GameLobby = ({ onCreateGame, onJoinGame, onFetchRooms, isLoading }) => {
   const [playerName, setPlayerName] = useState('');
   const [roomCode, setRoomCode] = useState('');
   const [activeTab, setActiveTab] = useState('create');
   const [language, setLanguage] = useState('en');
+  const [vsEngine, setVsEngine] = useState(false);
+  const [openRooms, setOpenRooms] = useState([]);
+  const [roomsCursor, setRoomsCursor] = useState(null);
+  const [roomsLoading, setRoomsLoading] = useState(false);
+
+  // Load the first page of open rooms, or append the next page when a cursor is given
+  const loadRooms = useCallback(async (cursor = null) => {
+    setRoomsLoading(true);
+    try {
+      const page = await onFetchRooms(cursor);
+      setOpenRooms(previous => (cursor ? [...previous, ...page.rooms] : page.rooms));
+      setRoomsCursor(page.next_cursor);
+    } catch (err) {
+      console.error('Lobby error:', err);
+    } finally {
+      setRoomsLoading(false);
+    }
+  }, [onFetchRooms]);
+
+  useEffect(() => {
+    if (activeTab === 'join') {
+      loadRooms();
+    }
+  }, [activeTab, loadRooms]);
 
   const handleCreateGame = (e) => {
     e.preventDefault();
     if (playerName.trim()) {
-      onCreateGame(playerName.trim());
+      onCreateGame(playerName.trim(), vsEngine);
     }
   };
 
@@ -86,12 +110,20 @@ const GameLobby = ({ onCreateGame, onJoinGame, isLoading }) => {
               required
             />
           </div>
+          <label className="flex items-center space-x-2 text-sm text-gray-700">
+            <input
+              type="checkbox"
+              checked={vsEngine}
+              onChange={(e) => setVsEngine(e.target.checked)}
+            />
+            <span>Play against the computer</span>
+          </label>
           <button
             type="submit"
             disabled={isLoading || !playerName.trim()}
             className="w-full bg-blue-500 text-white py-2 px-4 rounded-md hover:bg-blue-600 disabled:opacity-50 disabled:cursor-not-allowed"
           >
-            {isLoading ? 'Creating...' : 'Create Game Room'}
+            {isLoading ? 'Creating...' : (vsEngine ? 'Start Game' : 'Create Game Room')}
           </button>
         </form>
       ) : (
@@ -131,6 +163,51 @@ const GameLobby = ({ onCreateGame, onJoinGame, isLoading }) => {
           >
             {isLoading ? 'Joining...' : 'Join Game'}
           </button>
+          <div>
+            <div className="flex justify-between items-center mb-1">
+              <span className="text-sm font-medium text-gray-700">Open Rooms</span>
+              <button
+                type="button"
+                onClick={() => loadRooms()}
+                disabled={roomsLoading}
+                className="text-xs text-blue-500 hover:underline disabled:opacity-50"
+              >
+                Refresh
+              </button>
+            </div>
+            {openRooms.length === 0 ? (
+              <p className="text-xs text-gray-500">
+                {roomsLoading ? 'Loading...' : 'No open rooms right now.'}
+              </p>
+            ) : (
+              <ul className="max-h-48 overflow-y-auto border border-gray-200 rounded-md divide-y">
+                {openRooms.map(room => (
+                  <li key={room.game_id}>
+                    <button
+                      type="button"
+                      onClick={() => setRoomCode(room.room_code)}
+                      className={`w-full flex justify-between px-3 py-2 text-sm hover:bg-gray-100 ${
+                        room.room_code === roomCode ? 'bg-green-50' : ''
+                      }`}
+                    >
+                      <span className="font-mono">{room.room_code}</span>
+                      <span className="text-gray-600">{room.host}</span>
+                    </button>
+                  </li>
+                ))}
+              </ul>
+            )}
+            {roomsCursor && (
+              <button
+                type="button"
+                onClick={() => loadRooms(roomsCursor)}
+                disabled={roomsLoading}
+                className="mt-1 text-xs text-blue-500 hover:underline disabled:opacity-50"
+              >
+                {roomsLoading ? 'Loading...' : 'Load more'}
+              </button>
+            )}
+          </div>
         </form>
       )}
       
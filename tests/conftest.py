@@ -0,0 +1,144 @@
+"""
+Shared fixtures: the backend modules on the import path and the API on an in-memory database.
+"""
+
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "kings_valley_test")
+
+# Hand-picked positions as rules.to_string boards, player 1 to move
+POSITIONS = SimpleNamespace(
+    # Player 1's king slides from the corner onto the centre, stopped by the pawn behind it
+    king_to_centre="K...." "....." "....." "...p." "....k",
+    # Sliding (4, 4) to (1, 1) leaves player 2's king in the corner without a move
+    boxed_in="kP..." "P...." "....." "....." "K...P",
+    # Player 1's pawn on (4, 0) slides up until the pawn on (2, 0) stops it
+    blocked_slide="k...." "....." "p...." "....." "P...K",
+)
+# Player 1's opening move: the corner pawn slides up to (1, 0)
+FIRST_MOVE = {"from_row": 4, "from_col": 0, "to_row": 1, "to_col": 0}
+
+
+@pytest.fixture(scope="session")
+def playout_positions():
+    """Factory for (bitboard, player to move) pairs sampled from seeded random games"""
+    import rules
+
+    def positions(count, seed):
+        rng = random.Random(seed)
+        bb, player = rules.INITIAL_BITBOARD, 1
+        sampled = []
+        while len(sampled) < count:
+            moves = rules.legal_moves(bb, player)
+            if rules.winner(bb) is not None or not moves:
+                bb, player = rules.INITIAL_BITBOARD, 1
+                continue
+            sampled.append((bb, player))
+            bb = rules.apply_move(bb, *rng.choice(moves))
+            player = 3 - player
+        return sampled
+
+    return positions
+
+
+@pytest.fixture(scope="session")
+def positions():
+    return POSITIONS
+
+
+@pytest.fixture(scope="session")
+def first_move():
+    return dict(FIRST_MOVE)
+
+
+@pytest.fixture(scope="session")
+def board_json():
+    """Nested board JSON, as the API sends it, for a rules.to_string board"""
+    import models
+
+    def to_json(board):
+        return [[piece and piece.model_dump(mode="json") for piece in row] for row in models.board_from_string(board)]
+
+    return to_json
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server
+
+    yield server
+    server.engine_executor.shutdown()
+    server.analysis_executor.shutdown()
+
+
+@pytest.fixture
+def db(server, monkeypatch):
+    """A fresh in-memory database behind the server, with its in-process caches emptied"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["kings_valley_test"]
+    monkeypatch.setattr(server, "db", database)
+    for cache in (server.game_cache, server.closed_games, server.response_bodies, server.analysis_cache):
+        cache.clear()
+    server.open_lobby.rooms.clear()
+    server.open_lobby.order.clear()
+    return database
+
+
+@pytest.fixture
+def client(server, db):
+    from fastapi.testclient import TestClient
+
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def start_game(client):
+    """start_game(host name) creates a game, joins it as "B" and returns (game id, {player number: player id})"""
+    def create_and_join(host="A"):
+        created = client.post("/api/game/create", json={"player_name": host}).json()["game"]
+        joined = client.post("/api/game/join", json={"room_code": created["room_code"], "player_name": "B"}).json()
+        return created["id"], {p["player_number"]: p["id"] for p in joined["game"]["players"]}
+
+    return create_and_join
+
+
+@pytest.fixture
+def two_player_game(start_game):
+    """(game id, {player number: player id}) of a game both players have joined"""
+    return start_game()
+
+
+@pytest.fixture
+def engine_game(client):
+    """(game id, human player id) of a game against the server engine"""
+    created = client.post("/api/game/create", json={"player_name": "Solo", "vs_engine": True}).json()["game"]
+    return created["id"], next(p["id"] for p in created["players"] if not p["is_engine"])
+
+
+@pytest.fixture
+def play(client):
+    """play(game id, player id, move) posts one move and returns the response"""
+    def post_move(game_id, player_id, move):
+        return client.post("/api/game/move", json={"game_id": game_id, "player_id": player_id, **move})
+
+    return post_move
+
+
+@pytest.fixture
+def set_board(server, db):
+    """set_board(game id, board) rewrites a stored game's board and drops the cached copy"""
+    def rewrite(game_id, board):
+        asyncio.run(db.games.update_one({"id": game_id}, {"$set": {"game_state.board": board}}))
+        server.game_cache.clear()
+
+    return rewrite
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+import engine
+import rules
+import tablebase
+
+
+def mirrored(board):
+    return "".join(board[row:row + 5][::-1] for row in range(0, 25, 5))
+
+
+def test_mirror_square_flips_columns(server):
+    assert server.mirror_square(rules.square(0, 0)) == rules.square(0, 4)
+    assert server.mirror_square(rules.square(3, 1)) == rules.square(3, 3)
+    assert server.mirror_square(rules.CENTER) == rules.CENTER
+    assert all(server.mirror_square(server.mirror_square(sq)) == sq for sq in range(rules.NUM_SQUARES))
+
+
+def test_mirror_image_reuses_the_analysis_with_mapped_squares(db, client, positions, board_json):
+    board = positions.king_to_centre
+    first = client.post("/api/analyze", json={"board": board_json(board), "player": 1}).json()
+    assert first["cached"] is False
+    assert first["best_move"] == {"from_pos": {"row": 0, "col": 0}, "to_pos": {"row": 2, "col": 2}}
+    assert first["result"] == "win" and first["distance"] == 1
+
+    image = client.post("/api/analyze", json={"board": board_json(mirrored(board)), "player": 1}).json()
+    assert image["cached"] is True
+    assert image["best_move"] == {"from_pos": {"row": 0, "col": 4}, "to_pos": {"row": 2, "col": 2}}
+    assert image["pv"] == [image["best_move"]]
+    assert (image["score"], image["result"]) == (first["score"], first["result"])
+
+
+def test_invalid_positions_are_rejected(db, client, positions, board_json):
+    board = positions.king_to_centre
+    no_king = board.replace("k", "p")
+    assert client.post("/api/analyze", json={"board": board_json(no_king)}).status_code == 400
+    assert client.post("/api/analyze", json={"board": board_json(board)[:4]}).status_code == 400
+    assert client.post("/api/analyze", json={"board": board_json(board), "player": 3}).status_code == 400
+
+
+def test_concurrent_requests_share_one_search(server, db, monkeypatch, positions):
+    searches = []
+    release = threading.Event()
+
+    def slow_search(bb, player, time_budget):
+        searches.append((bb, player))
+        release.wait(5)
+        return engine.SearchResult((0, 12), 42, 3, 100)
+
+    monkeypatch.setattr(engine, "search", slow_search)
+    monkeypatch.setattr(server, "analysis_executor", ThreadPoolExecutor(1))
+    key = tablebase.canonical_key(rules.from_string(positions.king_to_centre), 1)
+
+    async def three_requests():
+        requests = asyncio.gather(*(server.analyze_canonical(key) for _ in range(3)))
+        await asyncio.sleep(0.05)
+        assert list(server.analysis_pending) == [key]
+        release.set()
+        return await requests
+
+    results = asyncio.run(three_requests())
+    server.analysis_executor.shutdown()
+    assert len(searches) == 1 and searches[0] == tablebase.unpack(key)
+    assert results == [(engine.SearchResult((0, 12), 42, 3, 100), False)] * 3
+    assert server.analysis_pending == {}
+    assert asyncio.run(server.analyze_canonical(key)) == (results[0][0], True)
+
+
+def test_analyses_beyond_the_pending_limit_are_turned_away(server, db, monkeypatch, playout_positions):
+    release = threading.Event()
+
+    def blocked_search(bb, player, time_budget):
+        release.wait(5)
+        return engine.SearchResult(None, 0, 0, 0)
+
+    monkeypatch.setattr(engine, "search", blocked_search)
+    monkeypatch.setattr(server, "analysis_executor", ThreadPoolExecutor(2))
+    monkeypatch.setattr(server, "ANALYSIS_MAX_PENDING", 2)
+    keys = list(dict.fromkeys(tablebase.canonical_key(bb, player) for bb, player in playout_positions(20, 0)))[:3]
+
+    async def burst():
+        running = [asyncio.ensure_future(server.analyze_canonical(key)) for key in keys[:2]]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as refused:
+            await server.analyze_canonical(keys[2])
+        # A position already being searched still joins that search
+        joined = asyncio.ensure_future(server.analyze_canonical(keys[0]))
+        release.set()
+        await asyncio.gather(*running, joined)
+        return refused.value
+
+    refused = asyncio.run(burst())
+    server.analysis_executor.shutdown()
+    assert refused.status_code == 503 and refused.headers["Retry-After"] == "1"
+    assert server.analysis_pending == {}
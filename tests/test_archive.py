@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import archive
+
+STALE = datetime(2026, 1, 1, 12, 0, 0, 123000)  # BSON keeps milliseconds
+
+
+def test_pack_round_trips_the_document():
+    doc = {"_id": "mongo-id", "id": "g1", "room_code": "ABC123", "status": "finished", "version": 7,
+           "created_at": STALE, "updated_at": STALE, "game_state": {"board": "P" * 25, "moves": [1, 2, 3]}}
+    entry = archive.pack_archived(doc)
+    assert {field: entry[field] for field in archive.INDEXED_FIELDS} == \
+        {field: doc[field] for field in archive.INDEXED_FIELDS}
+    assert archive.unpack_archived(entry) == {k: v for k, v in doc.items() if k != "_id"}
+
+
+def test_batch_moves_only_finished_and_abandoned_games(db):
+    now = datetime.utcnow()
+    asyncio.run(db.games.insert_many([
+        {"id": "finished", "status": "finished", "version": 3, "updated_at": now},
+        {"id": "abandoned", "status": "waiting", "version": 0, "updated_at": now - timedelta(days=2)},
+        {"id": "waiting", "status": "waiting", "version": 0, "updated_at": now},
+        {"id": "playing", "status": "in_progress", "version": 2, "updated_at": now - timedelta(days=2)},
+    ]))
+    archived = []
+    moved = asyncio.run(archive.archive_batch(db.games, db.games_archive, now - timedelta(days=1), 10, archived.append))
+
+    assert moved == 2 and sorted(doc["id"] for doc in archived) == ["abandoned", "finished"]
+    assert sorted(doc["id"] for doc in asyncio.run(db.games.find().to_list(None))) == ["playing", "waiting"]
+    assert asyncio.run(archive.find_archived(db.games_archive, "finished"))["version"] == 3
+    assert asyncio.run(archive.archived_version(db.games_archive, "abandoned")) == 0
+    assert asyncio.run(archive.archived_version(db.games_archive, "playing")) is None
+
+
+class JoinBeforeDelete:
+    """The live collection with a player joining every room just before the archiver deletes it"""
+
+    def __init__(self, games):
+        self.games = games
+
+    def find(self, *args, **kwargs):
+        return self.games.find(*args, **kwargs)
+
+    async def delete_one(self, query):
+        await self.games.update_one({"_id": query["_id"]}, {"$set": {"status": "in_progress"}, "$inc": {"version": 1}})
+        return await self.games.delete_one(query)
+
+
+def test_room_joined_while_archiving_stays_live(db):
+    now = datetime.utcnow()
+    asyncio.run(db.games.insert_one({"id": "room", "status": "waiting", "version": 0, "updated_at": now - timedelta(days=2)}))
+    moved = asyncio.run(archive.archive_batch(JoinBeforeDelete(db.games), db.games_archive, now - timedelta(days=1), 10))
+
+    assert moved == 0
+    assert asyncio.run(db.games.find_one({"id": "room"}))["version"] == 1
+    assert asyncio.run(db.games_archive.count_documents({})) == 0
+
+
+def test_archived_game_is_still_served(server, db, client, two_player_game):
+    game_id, _ = two_player_game
+    asyncio.run(db.games.update_one({"id": game_id}, {"$set": {"status": "finished"}}))
+    asyncio.run(archive.archive_batch(db.games, db.games_archive, datetime.utcnow(), 10, server.forget_archived))
+
+    assert asyncio.run(db.games.count_documents({})) == 0
+    game = client.get(f"/api/game/{game_id}")
+    assert game.status_code == 200 and game.json()["status"] == "finished"
@@ -0,0 +1,57 @@
+import numpy as np
+
+import batch
+import rules
+
+
+def test_encode_decode_round_trips(playout_positions):
+    positions = [bb for bb, _ in playout_positions(200, 10)]
+    boards = batch.encode(positions)
+    assert boards.shape == (200, 5, 5)
+    assert batch.decode(boards) == positions
+
+
+def test_expand_matches_scalar_rules(playout_positions, positions):
+    # Playouts rarely box a side in, so the hand-picked positions add blocked and won successors
+    sampled = playout_positions(300, 11) + [(rules.from_string(board), 1) for board in vars(positions).values()]
+    boards = batch.encode(bb for bb, _ in sampled)
+    players = np.array([player for _, player in sampled])
+    expansion = batch.expand(boards, players)
+
+    successors = batch.decode(expansion.boards)
+    generated = [set() for _ in sampled]
+    for i, (parent, frm, to) in enumerate(zip(expansion.parent, expansion.from_sq, expansion.to_sq)):
+        generated[parent].add((int(frm), int(to)))
+        bb, player = sampled[parent]
+        after = rules.apply_move(bb, int(frm), int(to))
+        assert successors[i] == after
+        assert expansion.winners[i] == (rules.game_winner(after, 3 - player) or 0)
+    for (bb, player), moves in zip(sampled, generated):
+        assert moves == set(rules.legal_moves(bb, player))
+    assert {1, 0} <= set(expansion.winners.tolist())
+
+
+def test_winners_without_a_legal_move(positions):
+    boxed = rules.apply_move(rules.from_string(positions.boxed_in), rules.square(4, 4), rules.square(1, 1))
+    boards = batch.encode([boxed, boxed, rules.from_string(positions.king_to_centre)])
+    assert batch.winners(boards).tolist() == [0, 0, 0]
+    assert batch.winners(boards, np.array([2, 1, 1])).tolist() == [1, 0, 0]
+
+
+def test_legal_mask_and_is_legal_match_scalar_rules(playout_positions):
+    positions = playout_positions(100, 12)
+    boards = batch.encode(bb for bb, _ in positions)
+    players = np.array([player for _, player in positions])
+    mask = batch.legal_move_mask(boards, players)
+    for index, (bb, player) in enumerate(positions):
+        assert set(zip(*map(list, np.nonzero(mask[index])))) == set(rules.legal_moves(bb, player))
+
+    # One candidate per board: the first legal move, an illegal one and an off-board one in turn
+    from_sq, to_sq, expected = [], [], []
+    for index, (bb, player) in enumerate(positions):
+        frm, to = rules.legal_moves(bb, player)[0]
+        candidate = [(frm, to), (to, frm), (frm, rules.NUM_SQUARES)][index % 3]
+        from_sq.append(candidate[0])
+        to_sq.append(candidate[1])
+        expected.append(rules.is_legal(bb, player, *candidate))
+    assert batch.is_legal(boards, players, from_sq, to_sq).tolist() == expected
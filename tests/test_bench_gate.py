@@ -0,0 +1,17 @@
+from typer.testing import CliRunner
+
+import bench
+import rules
+
+
+def test_rules_hot_path_is_within_the_baseline():
+    result = CliRunner().invoke(bench.app, ["gate"])
+    assert result.exit_code == 0, result.output
+
+
+def test_gate_catches_a_slower_step(monkeypatch):
+    legal_moves = rules.legal_moves
+    monkeypatch.setattr(rules, "legal_moves", lambda bb, player: legal_moves(bb, player) and legal_moves(bb, player))
+    result = CliRunner().invoke(bench.app, ["gate"])
+    assert result.exit_code == 1
+    assert "REGRESSION beyond 25%: rules.legal_moves" in result.output
@@ -0,0 +1,46 @@
+import gzip
+
+import bodies
+from bodies import EncodedBody, choose_encoding
+
+LARGE = bodies.MIN_COMPRESS_SIZE
+
+
+def test_choose_encoding():
+    assert choose_encoding(None, LARGE) is None
+    assert choose_encoding("gzip", LARGE - 1) is None
+    assert choose_encoding("gzip, deflate", LARGE) == "gzip"
+    assert choose_encoding("GZIP;q=0.5", LARGE) == "gzip"
+    assert choose_encoding("gzip;q=0", LARGE) is None
+    assert choose_encoding("deflate", LARGE) is None
+    assert choose_encoding("*", LARGE) == bodies.PREFERRED_ENCODINGS[0]
+    assert choose_encoding("gzip, br", LARGE) == bodies.PREFERRED_ENCODINGS[0]
+
+
+def test_encoded_variants_are_built_once():
+    body = EncodedBody(3, b'{"moves": []}' * 100)
+    assert body.encoded(None) is body.identity
+    compressed = body.encoded("gzip")
+    assert gzip.decompress(compressed) == body.identity
+    assert body.encoded("gzip") is compressed
+
+
+def test_game_reads_honour_accept_encoding(client, two_player_game):
+    game_id, _ = two_player_game
+    plain = client.get(f"/api/game/{game_id}/legal-moves", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers and plain.headers["Vary"] == "Accept-Encoding"
+    compressed = client.get(f"/api/game/{game_id}/legal-moves", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+
+
+def test_body_is_cached_per_version(server, client, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    client.get(f"/api/game/{game_id}")
+    cached = server.response_bodies.get((game_id, "game"))
+    client.get(f"/api/game/{game_id}")
+    assert server.response_bodies.get((game_id, "game")) is cached
+
+    play(game_id, players[1], first_move)
+    assert client.get(f"/api/game/{game_id}").json()["version"] == 2
+    assert server.response_bodies.get((game_id, "game")).version == 2
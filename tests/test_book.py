@@ -0,0 +1,137 @@
+import random
+import threading
+
+import numpy as np
+import orjson
+import pytest
+from typer.testing import CliRunner
+
+import book
+import rules
+import tablebase
+
+OPENING = [(rules.square(4, 0), rules.square(1, 0)), (rules.square(0, 1), rules.square(3, 1))]
+
+
+def finished_record(seed):
+    """Export record of a seeded random game played to the end"""
+    rng = random.Random(seed)
+    bb, player, winner, moves = rules.INITIAL_BITBOARD, 1, None, []
+    while winner is None:
+        frm, to = rng.choice(rules.legal_moves(bb, player))
+        bb = rules.apply_move(bb, frm, to)
+        moves.append({"from_pos": dict(zip(("row", "col"), divmod(frm, 5))),
+                      "to_pos": dict(zip(("row", "col"), divmod(to, 5))), "player": player})
+        winner = rules.game_winner(bb, 3 - player)
+        player = 3 - player
+    players = [{"name": "A", "player_number": 1}, {"name": "B", "player_number": 2}]
+    return {"room_code": f"R{seed}", "status": "finished", "players": players, "winner": winner, "moves": moves}
+
+
+def test_added_games_are_counted_per_position():
+    opening = book.OpeningBook(plies=1)
+    opening.add_game(OPENING, winner=1)
+    opening.add_game(OPENING, winner=2)
+    opening.add_game(OPENING[:1] + [OPENING[1]], winner=1)
+
+    assert opening.moves(rules.INITIAL_BITBOARD, 1) == [book.BookMove(*OPENING[0], games=3, wins=2)]
+    # Only the first ply is recorded
+    after = rules.apply_move(rules.INITIAL_BITBOARD, *OPENING[0])
+    assert opening.moves(after, 2) == []
+    assert opening.best_move(rules.INITIAL_BITBOARD, 1, min_games=4) is None
+    assert opening.pending_games == 3
+
+
+def test_merge_records_sums_and_sorts():
+    a = np.array([(2, 5, 1, 1), (1, 7, 2, 0)], dtype=book.RECORD)
+    b = np.array([(2, 5, 3, 2), (1, 3, 1, 1)], dtype=book.RECORD)
+    merged = book.merge_records(a, b)
+    assert merged.tolist() == [(1, 3, 1, 1), (1, 7, 2, 0), (2, 5, 4, 3)]
+    assert len(book.merge_records(np.zeros(0, dtype=book.RECORD))) == 0
+
+
+def test_saves_from_two_workers_add_up(tmp_path):
+    path = tmp_path / "opening.kvbook"
+    first, second = book.OpeningBook(), book.OpeningBook()
+    first.add_game(OPENING, winner=1)
+    second.add_game(OPENING, winner=2)
+    second.add_game(OPENING, winner=2)
+    first.save(path)
+    second.save(path)
+
+    assert (first.pending_games, first.overlay) == (0, {})
+    loaded = book.OpeningBook.load(path)
+    assert loaded.moves(rules.INITIAL_BITBOARD, 1) == [book.BookMove(*OPENING[0], games=3, wins=1)]
+    assert book.OpeningBook.load(tmp_path / "missing.kvbook").moves(rules.INITIAL_BITBOARD, 1) == []
+
+
+def test_failed_save_keeps_the_games(tmp_path, monkeypatch):
+    opening = book.OpeningBook()
+    opening.add_game(OPENING, winner=1)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(book, "write_records", fail)
+    with pytest.raises(OSError):
+        opening.save(tmp_path / "opening.kvbook")
+    assert opening.pending_games == 1 and opening.saving == {}
+    assert opening.moves(rules.INITIAL_BITBOARD, 1)[0].games == 1
+
+
+def test_games_added_during_a_threaded_save_are_kept(tmp_path, monkeypatch):
+    opening = book.OpeningBook()
+    opening.add_game(OPENING, winner=1)
+    writing, release = threading.Event(), threading.Event()
+    write_records = book.write_records
+
+    def slow_write(*args):
+        writing.set()
+        release.wait(5)
+        write_records(*args)
+
+    monkeypatch.setattr(book, "write_records", slow_write)
+    saver = threading.Thread(target=opening.save, args=(tmp_path / "opening.kvbook",))
+    saver.start()
+    assert writing.wait(5)
+    for winner in (1, 2, 2):
+        opening.add_game(OPENING, winner)
+        assert opening.moves(rules.INITIAL_BITBOARD, 1)[0].games == 1 + opening.pending_games
+    release.set()
+    saver.join()
+
+    assert opening.pending_games == 3 and opening.saving == {}
+    assert opening.moves(rules.INITIAL_BITBOARD, 1) == [book.BookMove(*OPENING[0], games=4, wins=2)]
+    opening.save(tmp_path / "opening.kvbook")
+    assert book.OpeningBook.load(tmp_path / "opening.kvbook").moves(rules.INITIAL_BITBOARD, 1)[0].games == 4
+
+
+def test_build_skips_records_that_do_not_replay(tmp_path):
+    good = finished_record(1)
+    illegal = {**finished_record(2), "room_code": "BAD"}
+    illegal["moves"][0] = {"from_pos": {"row": 4, "col": 0}, "to_pos": {"row": 2, "col": 0}, "player": 1}
+    export = tmp_path / "games.ndjson"
+    export.write_bytes(b"\n".join(orjson.dumps(record) for record in (good, illegal)) + b"\n")
+    output = tmp_path / "opening.kvbook"
+
+    result = CliRunner().invoke(book.app, ["build", str(export), "--output", str(output)])
+    assert result.exit_code == 0, result.output
+    assert "added 1 games" in result.output and "skipped 1 records" in result.output
+    first = good["moves"][0]
+    played = (rules.square(**first["from_pos"]), rules.square(**first["to_pos"]))
+    assert [move[:2] for move in book.OpeningBook.load(output).moves(rules.INITIAL_BITBOARD, 1)] == [played]
+
+
+@pytest.mark.parametrize("book_reply, legal", [((rules.square(0, 1), rules.square(3, 1)), True),
+                                               ((rules.square(0, 1), rules.square(2, 1)), False)])
+def test_engine_plays_book_moves_only_when_legal(server, monkeypatch, engine_game, play, first_move, book_reply, legal):
+    opening = book.OpeningBook()
+    after = rules.apply_move(rules.INITIAL_BITBOARD, *OPENING[0])
+    book.add_counts(opening.overlay, tablebase.pack(after, 2), book.pack_move(*book_reply), 10, 10)
+    monkeypatch.setattr(server, "opening_book", opening)
+
+    game_id, human = engine_game
+    reply = play(game_id, human, first_move).json()["engine_move"]
+    played = (rules.square(**reply["from_pos"]), rules.square(**reply["to_pos"]))
+    assert (played == book_reply) == legal
+    assert rules.is_legal(after, 2, *played)
@@ -0,0 +1,68 @@
+import asyncio
+
+from cache import LRUTTLCache
+from models import GameStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    evicted = []
+    cache = LRUTTLCache(2, ttl=60, on_evict=lambda key, value: evicted.append(key))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert evicted == ["b"]
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_peek_neither_refreshes_nor_counts():
+    clock = FakeClock()
+    cache = LRUTTLCache(2, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.peek("a") == 1
+    cache.set("c", 3)
+    assert cache.peek("a") is None  # still the oldest, so evicted
+    clock.now = 10
+    assert cache.peek("b") is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_stale_read_does_not_replace_newer_cached_game(server, two_player_game):
+    game_id, _ = two_player_game
+    current = server.game_cache.get(game_id)
+    stale = current.model_copy(update={"version": current.version - 1, "status": GameStatus.WAITING})
+    server.remember_game(stale)
+    assert server.game_cache.get(game_id) is current
+
+
+def test_read_racing_the_final_write_does_not_recache_the_game(server, db, two_player_game):
+    game_id, _ = two_player_game
+    # A reader fetches the open game, then the finishing write lands before the reader caches it
+    snapshot = asyncio.run(server.hydrate_game(asyncio.run(db.games.find_one({"id": game_id}))))
+    finished = snapshot.model_copy(update={"version": snapshot.version + 1, "status": GameStatus.FINISHED})
+    asyncio.run(db.games.update_one({"id": game_id}, {"$set": {"status": "finished", "version": finished.version}}))
+    server.remember_game(finished)
+    server.remember_game(snapshot)
+    assert server.game_cache.peek(game_id) is None
+    assert asyncio.run(server.load_game(game_id)).status == GameStatus.FINISHED
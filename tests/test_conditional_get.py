@@ -0,0 +1,34 @@
+def test_unchanged_game_revalidates_with_304(client, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    for path in (f"/api/game/{game_id}", f"/api/game/{game_id}/legal-moves"):
+        first = client.get(path)
+        assert first.headers["ETag"] == '"1"' and first.headers["Cache-Control"] == "no-cache"
+        not_modified = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        assert not_modified.status_code == 304 and not not_modified.content
+        assert client.get(path, headers={"If-None-Match": 'W/"0", "1"'}).status_code == 304
+
+    play(game_id, players[1], first_move)
+    changed = client.get(f"/api/game/{game_id}", headers={"If-None-Match": '"1"'})
+    assert changed.status_code == 200 and changed.headers["ETag"] == '"2"'
+    assert changed.json()["version"] == 2
+
+
+def test_conditional_get_of_an_unknown_game_is_404(client, db):
+    assert client.get("/api/game/missing", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_cold_cache_revalidation_skips_the_full_load(server, client, two_player_game, monkeypatch):
+    game_id, _ = two_player_game
+    loads = []
+
+    async def counted(game_id):
+        loads.append(game_id)
+
+    monkeypatch.setattr(server, "load_game_body", counted)
+    monkeypatch.setattr(server, "load_game", counted)
+    for path in (f"/api/game/{game_id}", f"/api/game/{game_id}/legal-moves"):
+        server.game_cache.clear()
+        server.response_bodies.clear()
+        not_modified = client.get(path, headers={"If-None-Match": '"1"'})
+        assert not_modified.status_code == 304 and not_modified.headers["ETag"] == '"1"'
+    assert loads == []
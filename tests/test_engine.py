@@ -0,0 +1,29 @@
+import engine
+import rules
+
+def test_search_takes_an_immediate_win(positions):
+    bb = rules.from_string(positions.king_to_centre)
+    assert engine.king_reaches_center(bb, 1)
+    result = engine.search(bb, 1, time_budget=1.0, table=engine.TranspositionTable(size_bits=10))
+    assert result.move == (rules.square(0, 0), rules.CENTER)
+    assert result.score > engine.WIN_THRESHOLD
+    assert result.pv[0] == result.move
+
+
+def test_search_blocks_the_opponents_win(positions):
+    bb = rules.from_string(positions.king_to_centre)
+    result = engine.search(bb, 2, time_budget=1.0, table=engine.TranspositionTable(size_bits=10))
+    assert not engine.king_reaches_center(rules.apply_move(bb, *result.move), 1)
+
+
+def test_search_without_a_move_returns_none(positions):
+    won = rules.apply_move(rules.from_string(positions.king_to_centre), rules.square(0, 0), rules.CENTER)
+    assert engine.search(won, 2, time_budget=0.1).move is None
+
+
+def test_zobrist_hash_depends_on_position_and_side(playout_positions):
+    sampled = playout_positions(200, 20)
+    hashes = {engine.zobrist_hash(bb, player) for bb, player in sampled}
+    assert len(hashes) == len(set(sampled))
+    bb, player = sampled[0]
+    assert engine.zobrist_hash(bb, player) ^ engine.zobrist_hash(bb, 3 - player) == engine.ZOBRIST_SIDE
@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import orjson
+
+import archive
+
+def finish(db, game_id, winner, updated_at):
+    asyncio.run(db.games.update_one({"id": game_id}, {"$set": {
+        "status": "finished", "game_state.winner": winner, "updated_at": updated_at,
+    }}))
+
+
+def export(client, **params):
+    response = client.get("/api/games/export", params=params)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_export_streams_live_then_archived_finished_games(db, client, start_game, play, first_move):
+    ids = []
+    for index in range(3):
+        game_id, players = start_game(f"A{index}")
+        play(game_id, players[1], first_move)
+        ids.append(game_id)
+    base = datetime(2026, 1, 1)
+    finish(db, ids[0], 1, base + timedelta(hours=2))
+    finish(db, ids[1], 2, base + timedelta(hours=1))
+    finish(db, ids[2], 1, base)
+    doc = asyncio.run(db.games.find_one({"id": ids[2]}))
+    asyncio.run(db.games_archive.insert_one(archive.pack_archived(doc)))
+    asyncio.run(db.games.delete_one({"id": ids[2]}))
+
+    records = export(client)
+    assert [record["id"] for record in records] == [ids[1], ids[0], ids[2]]
+    assert [record["winner"] for record in records] == [2, 1, 1]
+    archived = records[-1]
+    assert set(archived) == {"id", "room_code", "status", "players", "winner", "created_at", "updated_at", "moves"}
+    assert [p["name"] for p in archived["players"]] == ["A2", "B"]
+    assert [(m["from_pos"], m["to_pos"], m["player"]) for m in archived["moves"]] == \
+        [({"row": 4, "col": 0}, {"row": 1, "col": 0}, 1)]
+
+    recent = export(client, since=(base + timedelta(hours=1)).isoformat())
+    assert sorted(record["id"] for record in recent) == sorted(ids[:2])
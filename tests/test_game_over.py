@@ -0,0 +1,27 @@
+import rules
+
+# Boxes player 2's king into the corner of positions.boxed_in
+BOXING_MOVE = {"from_row": 4, "from_col": 4, "to_row": 1, "to_col": 1}
+
+
+def test_game_winner_when_the_player_to_move_is_stuck(positions):
+    bb = rules.apply_move(rules.from_string(positions.boxed_in), rules.square(4, 4), rules.square(1, 1))
+    assert rules.legal_moves(bb, 2) == []
+    assert rules.winner(bb) is None
+    assert rules.game_winner(bb, 2) == 1
+    assert rules.game_winner(rules.INITIAL_BITBOARD, 1) is None
+
+
+def test_leaving_the_opponent_without_a_move_wins(client, two_player_game, positions, set_board, play):
+    game_id, players = two_player_game
+    set_board(game_id, positions.boxed_in)
+    assert play(game_id, players[1], BOXING_MOVE).json()["winner"] == 1
+    game = client.get(f"/api/game/{game_id}").json()
+    assert game["status"] == "finished" and game["game_state"]["winner"] == 1
+
+
+def test_engine_without_a_move_loses_instead_of_stalling(client, engine_game, positions, set_board, play):
+    game_id, human = engine_game
+    set_board(game_id, positions.boxed_in)
+    assert play(game_id, human, BOXING_MOVE).json() == {"success": True, "winner": 1, "engine_move": None}
+    assert client.get(f"/api/game/{game_id}").json()["status"] == "finished"
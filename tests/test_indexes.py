@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+# Trimmed explain() winning plans as MongoDB reports them
+INDEXED_PLAN = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "id_unique"}}}
+SCANNING_PLAN = {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}}
+OR_PLAN = {"stage": "SUBPLAN", "inputStage": {"stage": "OR", "inputStages": [
+    {"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}},
+]}}
+
+
+def test_plan_stages_walks_the_whole_plan_tree(server):
+    assert server.plan_stages(INDEXED_PLAN) == ["LIMIT", "FETCH", "IXSCAN"]
+    assert "COLLSCAN" in server.plan_stages(SCANNING_PLAN)
+    assert server.plan_stages(OR_PLAN) == ["SUBPLAN", "OR", "IXSCAN", "FETCH", "COLLSCAN"]
+
+
+def test_every_hot_query_leads_with_an_indexed_field(server):
+    leading_fields = {next(iter(index.document["key"])) for index in server.GAME_INDEXES}
+    for query in server.HOT_GAME_QUERIES:
+        # Every $or branch needs its own index or the planner scans
+        for branch in query.get("$or", [query]):
+            assert leading_fields & set(branch), branch
+
+
+class ExplainedCollection:
+    """Stands in for a collection: indexes are accepted, and find(query).limit(1).explain() returns plans[query]"""
+
+    def __init__(self, plans=None):
+        self.plans = plans or {}
+        self.query = None
+
+    async def create_indexes(self, indexes):
+        return [index.document["name"] for index in indexes]
+
+    def find(self, query):
+        self.query = query
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plans.get(repr(self.query), INDEXED_PLAN)}}
+
+
+def fake_db(plans=None):
+    return SimpleNamespace(games=ExplainedCollection(plans), games_archive=ExplainedCollection(),
+                           status_checks=ExplainedCollection())
+
+
+def test_ensure_indexes_accepts_indexed_plans(server, monkeypatch):
+    monkeypatch.setattr(server, "db", fake_db())
+    asyncio.run(server.ensure_indexes())
+
+
+def test_ensure_indexes_reports_a_collection_scan(server, monkeypatch):
+    query = server.HOT_GAME_QUERIES[1]
+    monkeypatch.setattr(server, "db", fake_db({repr(query): SCANNING_PLAN}))
+    with pytest.raises(RuntimeError) as scanned:
+        asyncio.run(server.ensure_indexes())
+    assert str(query) in str(scanned.value) and "COLLSCAN" in str(scanned.value)
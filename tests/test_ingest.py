@@ -0,0 +1,84 @@
+import asyncio
+
+import orjson
+import pytest
+
+import ingest
+
+MOVE = {"from_pos": {"row": 4, "col": 0}, "to_pos": {"row": 1, "col": 0}, "player": 1}
+PLAYERS = [{"name": "A", "player_number": 1}, {"name": "B", "player_number": 2}]
+RECORD = {"room_code": "ABC123", "status": "in_progress", "players": PLAYERS, "winner": None, "moves": [MOVE]}
+
+
+def line(**changes):
+    return orjson.dumps({**RECORD, **changes})
+
+
+def test_valid_record_becomes_a_stored_document():
+    docs, positions, errors = ingest.convert_lines([line(), b"", line(id="fixed")])
+    assert (positions, errors) == ([0, 2], [])
+    assert docs[1]["id"] == "fixed"
+    assert docs[0]["id"] == ingest.convert_lines([line()])[0][0]["id"]  # derived from the line, so stable
+    assert docs[0]["version"] == 2 and docs[0]["game_state"]["current_player"] == 2
+    assert docs[0]["schema"] == ingest.STORED_SCHEMA
+
+
+@pytest.mark.parametrize("bad_line, reason", [
+    (b"{not json", "unexpected character"),
+    (b"[1, 2]", "record must be a JSON object"),
+    (line(players="A"), "players must list one or two players"),
+    (line(players=["A", "B"]), "every player must be an object"),
+    (line(players=[PLAYERS[1], PLAYERS[0]]), "players must be numbered 1 then 2"),
+    (line(room_code=7), "room_code is required"),
+    (line(id=7), "id must be a string"),
+    (line(moves=5), "moves must be a list of objects"),
+    (line(moves=[5]), "moves must be a list of objects"),
+    (line(moves=[{**MOVE, "from_pos": {"row": "4", "col": 0}}]), "move 0 from_pos must be {row, col}"),
+    (line(moves=[{**MOVE, "to_pos": {"row": 9, "col": 0}}]), "move 0 to_pos is off the board"),
+    (line(moves=[{**MOVE, "player": 2}]), "move 0 is by player 2 but it is player 1's turn"),
+    (line(moves=[{**MOVE, "to_pos": {"row": 2, "col": 0}}]), "move 0 is illegal"),
+    (line(moves=[{**MOVE, "timestamp": 12}]), "Bad timestamp 12"),
+    (line(winner=1), "recorded winner 1 but the moves give None"),
+    (line(status="finished"), "status finished does not match the replayed result"),
+    (line(status="paused"), "Unknown status 'paused'"),
+    (line(players=PLAYERS[:1], moves=[]), "status in_progress does not match 1 player(s)"),
+    (line(created_at="2026-01-01T00:00:00+00:00", moves=[{**MOVE, "timestamp": "2026-01-01T00:00:01"}]), "offset-naive"),
+])
+def test_bad_records_are_rejected_with_a_reason(bad_line, reason):
+    docs, positions, errors = ingest.convert_lines([bad_line])
+    assert docs == [] and len(errors) == 1
+    assert errors[0][0] == 0 and reason.lower() in errors[0][1].lower()
+
+
+def test_import_reports_rejections_and_skips_duplicates(client, db):
+    asyncio.run(db.games.create_index("id", unique=True))
+    body = b"\n".join([line(id="g1"), line(moves=5), line(id="g1"), line(id="g2", room_code="XYZ789")])
+    stats = client.post("/api/games/import", content=body).json()
+    assert stats == {"lines": 4, "inserted": 2, "duplicates": 1, "rejected": 1,
+                     "errors": [{"line": 2, "reason": "moves must be a list of objects"}]}
+    assert client.get("/api/game/g1").json()["game_state"]["current_player"] == 2
+
+    resumed = client.post("/api/games/import", params={"skip": 3}, content=body).json()
+    assert (resumed["lines"], resumed["inserted"], resumed["duplicates"]) == (4, 0, 1)
+
+
+def test_failed_import_returns_the_checkpoint(server, client, db, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 1)
+    monkeypatch.setattr(server, "IMPORT_IN_FLIGHT", 1)
+    real_insert = ingest.insert_batch
+    calls = []
+
+    async def failing_insert(collection, docs, lines, stats):
+        calls.append(docs)
+        if len(calls) == 2:
+            raise ConnectionError("database went away")
+        await real_insert(collection, docs, lines, stats)
+
+    monkeypatch.setattr(ingest, "insert_batch", failing_insert)
+    body = b"\n".join([line(id="g1"), line(id="g2", room_code="XYZ789"), line(id="g3", room_code="QRS456")])
+    failed = client.post("/api/games/import", content=body)
+    assert failed.status_code == 500
+    detail = failed.json()["detail"]
+    assert detail["error"] == "database went away"
+    assert (detail["lines"], detail["inserted"]) == (1, 1)
+    assert asyncio.run(db.games.count_documents({})) == 1
@@ -0,0 +1,28 @@
+import rules
+
+
+def squares(moves):
+    return {(rules.square(m["from_pos"]["row"], m["from_pos"]["col"]), rules.square(m["to_pos"]["row"], m["to_pos"]["col"]))
+            for m in moves}
+
+
+def test_legal_moves_of_the_opening_position(client, two_player_game):
+    game_id, _ = two_player_game
+    body = client.get(f"/api/game/{game_id}/legal-moves").json()
+    assert body["player"] == 1
+    assert squares(body["moves"]) == set(rules.legal_moves(rules.INITIAL_BITBOARD, 1))
+
+
+def test_legal_moves_follow_the_turn(client, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    play(game_id, players[1], first_move)
+    body = client.get(f"/api/game/{game_id}/legal-moves").json()
+    bb = rules.apply_move(rules.INITIAL_BITBOARD, rules.square(4, 0), rules.square(1, 0))
+    assert body["player"] == 2
+    assert squares(body["moves"]) == set(rules.legal_moves(bb, 2))
+
+
+def test_waiting_game_has_no_legal_moves(client):
+    game = client.post("/api/game/create", json={"player_name": "A"}).json()["game"]
+    assert client.get(f"/api/game/{game['id']}/legal-moves").json()["moves"] == []
+    assert client.get("/api/game/missing/legal-moves").status_code == 404
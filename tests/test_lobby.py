@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import GameStatus
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def open_rooms(server, count):
+    """count waiting rooms a minute apart, oldest first"""
+    rooms = []
+    for index in range(count):
+        room = server.LobbyRoom(game_id=f"g{index}", room_code=f"R{index:05d}", host=f"host {index}",
+                                created_at=BASE + timedelta(minutes=index))
+        server.open_lobby._put(room)
+        rooms.append(room)
+    return rooms
+
+
+def test_pages_walk_every_room_newest_first(server, db):
+    rooms = open_rooms(server, 7)
+    seen = []
+    cursor = None
+    while True:
+        page = server.open_lobby.page(cursor, 3)
+        seen.extend(room.game_id for room in page.rooms)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [room.game_id for room in reversed(rooms)]
+
+
+def test_rooms_leave_the_lobby_when_joined(server, client):
+    created = client.post("/api/game/create", json={"player_name": "Host"}).json()["game"]
+    assert [room["room_code"] for room in client.get("/api/lobby").json()["rooms"]] == [created["room_code"]]
+    client.post("/api/game/join", json={"room_code": created["room_code"], "player_name": "Guest"})
+    assert client.get("/api/lobby").json() == {"rooms": [], "next_cursor": None}
+
+
+def test_timezone_aware_cursor_is_read_as_utc(server, db):
+    open_rooms(server, 4)
+    cursor = server.open_lobby.page(None, 2).next_cursor
+    created_at, _, game_id = cursor.partition("|")
+    shifted = datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    page = server.open_lobby.page(f"{shifted.isoformat()}|{game_id}", 2)
+    assert [room.game_id for room in page.rooms] == ["g1", "g0"]
+
+
+@pytest.mark.parametrize("cursor", ["yesterday|g1", "|", "2026-13-01T00:00:00|g1"])
+def test_malformed_cursor_is_a_bad_request(client, cursor):
+    assert client.get("/api/lobby", params={"cursor": cursor}).status_code == 400
+
+
+def test_rebuild_keeps_changes_made_while_loading(server, db):
+    stale, joined = open_rooms(server, 2)
+
+    async def rebuild():
+        async def load():
+            # A room opens and another is joined while the database query runs
+            server.open_lobby.remove(joined.game_id)
+            server.open_lobby.add(server.Game(
+                id="new", room_code="NEW001", players=[server.Player(name="N", player_number=1)],
+                game_state=server.GameState(board=server.initialize_board()),
+                status=GameStatus.WAITING, created_at=BASE + timedelta(hours=1),
+            ))
+            return [stale, joined]
+        await server.open_lobby.rebuild(load)
+
+    asyncio.run(rebuild())
+    assert [room.game_id for room in server.open_lobby.page(None, 10).rooms] == ["new", stale.game_id]
+
+
+def test_cursors_survive_a_rebuild_from_the_database(server, db):
+    for index in range(2):
+        server.open_lobby.add(server.Game(
+            id=f"g{index}", room_code=f"R{index:05d}", players=[server.Player(name="H", player_number=1)],
+            game_state=server.GameState(board=server.initialize_board()),
+            status=GameStatus.WAITING, created_at=BASE + timedelta(microseconds=1500 + index * 1000),
+        ))
+    cursor = server.open_lobby.page(None, 1).next_cursor
+
+    async def reload():
+        # What the database hands back: the same rooms at millisecond precision
+        stored = [room.model_copy() for room in server.open_lobby.rooms.values()]
+        for room in stored:
+            room.created_at = room.created_at.replace(microsecond=room.created_at.microsecond // 1000 * 1000)
+        return stored
+
+    asyncio.run(server.open_lobby.rebuild(reload))
+    assert [room.game_id for room in server.open_lobby.page(cursor, 1).rooms] == ["g0"]
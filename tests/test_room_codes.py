@@ -0,0 +1,23 @@
+import asyncio
+
+
+def test_room_code_collision_draws_a_new_code(server, db, client, monkeypatch):
+    # mongomock ignores the partial filter, so only open games are created here
+    asyncio.run(db.games.create_indexes(server.GAME_INDEXES))
+    codes = iter(["AAAAAA", "AAAAAA", "BBBBBB"])
+    monkeypatch.setattr(server, "generate_room_code", lambda: next(codes))
+
+    first = client.post("/api/game/create", json={"player_name": "A"}).json()["game"]
+    second = client.post("/api/game/create", json={"player_name": "B"}).json()["game"]
+    assert (first["room_code"], second["room_code"]) == ("AAAAAA", "BBBBBB")
+    assert asyncio.run(db.games.count_documents({})) == 2
+
+
+def test_create_gives_up_after_repeated_collisions(server, db, client, monkeypatch):
+    asyncio.run(db.games.create_indexes(server.GAME_INDEXES))
+    monkeypatch.setattr(server, "generate_room_code", lambda: "AAAAAA")
+    assert client.post("/api/game/create", json={"player_name": "A"}).status_code == 200
+
+    retried = client.post("/api/game/create", json={"player_name": "B"})
+    assert retried.status_code == 503
+    assert asyncio.run(db.games.count_documents({})) == 1
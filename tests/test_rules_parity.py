@@ -0,0 +1,134 @@
+"""
+Both APIs must accept exactly the same moves.
+
+The shared rules are fuzzed square pair by square pair against a
+straightforward slide-until-blocked reference on random playout positions.
+deployment/api carries copies of backend/models.py and backend/rules.py, which
+must match; both HTTP APIs are then checked on hand-picked positions.
+"""
+
+import asyncio
+from importlib import util
+from pathlib import Path
+
+import pytest
+
+import models
+import rules
+
+ROOT = Path(__file__).resolve().parents[1]
+COORDINATES = range(-1, rules.BOARD_SIZE + 1)
+
+
+def reference_is_valid(board, from_row, from_col, to_row, to_col, player):
+    """Move check written directly from the rules: a piece slides in one of eight directions until blocked"""
+    if not all(0 <= x < rules.BOARD_SIZE for x in (from_row, from_col, to_row, to_col)):
+        return False
+    piece = board[from_row][from_col]
+    if piece is None or piece.player != player or board[to_row][to_col] is not None:
+        return False
+    row_diff, col_diff = to_row - from_row, to_col - from_col
+    if (row_diff, col_diff) == (0, 0) or (row_diff and col_diff and abs(row_diff) != abs(col_diff)):
+        return False
+    row_dir = (row_diff > 0) - (row_diff < 0)
+    col_dir = (col_diff > 0) - (col_diff < 0)
+    row, col = from_row, from_col
+    while 0 <= row + row_dir < rules.BOARD_SIZE and 0 <= col + col_dir < rules.BOARD_SIZE:
+        if board[row + row_dir][col + col_dir] is not None:
+            break
+        row, col = row + row_dir, col + col_dir
+    return (row, col) == (to_row, to_col)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_shared_rules_match_reference(playout_positions, seed):
+    for bb, player in playout_positions(150, seed):
+        board = models.board_from_bitboard(bb)
+        assert rules.from_board(board) == bb
+        accepted = set()
+        for from_row in COORDINATES:
+            for from_col in COORDINATES:
+                for to_row in COORDINATES:
+                    for to_col in COORDINATES:
+                        expected = reference_is_valid(board, from_row, from_col, to_row, to_col, player)
+                        from_pos = models.Position(row=from_row, col=from_col)
+                        to_pos = models.Position(row=to_row, col=to_col)
+                        assert models.is_valid_move(board, from_pos, to_pos, player) == expected
+                        if expected:
+                            accepted.add((rules.square(from_row, from_col), rules.square(to_row, to_col)))
+        assert set(rules.legal_moves(bb, player)) == accepted
+
+
+@pytest.mark.parametrize("name", ["models.py", "rules.py"])
+def test_deployment_copies_match_the_backend(name):
+    copy = (ROOT / "deployment" / "api" / name).read_bytes()
+    assert copy == (ROOT / "backend" / name).read_bytes(), f"run 'yarn sync-rules' in deployment to refresh api/{name}"
+
+
+class BackendApi:
+    def __init__(self, client, start_game, set_board, play):
+        self.client = client
+        self.start_game = start_game
+        self.set_board = set_board
+        self.play = play
+
+    def game_at(self, board):
+        game_id, players = self.start_game()
+        self.set_board(game_id, board)
+        self.player_id = players[1]
+        return game_id
+
+    def move(self, game_id, frm, to):
+        reply = self.play(game_id, self.player_id, {"from_row": frm[0], "from_col": frm[1], "to_row": to[0], "to_col": to[1]})
+        if reply.status_code != 200:
+            return reply.status_code, None
+        state = self.client.get(f"/api/game/{game_id}").json()
+        return 200, state["game_state"]["winner"] if state["status"] == "finished" else None
+
+
+class DeploymentApi:
+    def __init__(self, module, client, board_json):
+        self.module = module
+        self.client = client
+        self.board_json = board_json
+
+    def game_at(self, board):
+        created = self.client.post("/game/create", params={"player_name": "A"}).json()
+        self.client.post("/game/join", params={"room_code": created["room_code"], "player_name": "B"})
+        asyncio.run(self.module.db.games.update_one({"id": created["id"]}, {"$set": {"state.board": self.board_json(board)}}))
+        return created["id"]
+
+    def move(self, game_id, frm, to):
+        reply = self.client.post("/game/move", params={"game_id": game_id}, json={
+            "from_pos": {"row": frm[0], "col": frm[1]}, "to_pos": {"row": to[0], "col": to[1]},
+        })
+        if reply.status_code != 200:
+            return reply.status_code, None
+        game = reply.json()
+        return 200, game["state"]["winner"] if game["status"] == "finished" else None
+
+
+@pytest.fixture(params=["backend", "deployment"])
+def api(request, db, client, board_json, monkeypatch):
+    if request.param == "backend":
+        return BackendApi(client, *(request.getfixturevalue(name) for name in ("start_game", "set_board", "play")))
+    from fastapi.testclient import TestClient
+
+    spec = util.spec_from_file_location("deployment_api", ROOT / "deployment" / "api" / "index.py")
+    deployment = util.module_from_spec(spec)
+    spec.loader.exec_module(deployment)
+    monkeypatch.setattr(deployment, "db", db)
+    return DeploymentApi(deployment, TestClient(deployment.app), board_json)
+
+
+@pytest.mark.parametrize("board, frm, to, expected", [
+    ("blocked_slide", (4, 0), (1, 0), (400, None)),  # would jump the blocker
+    ("blocked_slide", (4, 0), (2, 0), (400, None)),  # onto the blocker
+    ("blocked_slide", (4, 4), (3, 4), (400, None)),  # stops short of the edge
+    ("blocked_slide", (4, 0), (3, 0), (200, None)),
+    ("blocked_slide", (2, 0), (3, 0), (400, None)),  # opponent's piece
+    ("king_to_centre", (0, 0), (2, 2), (200, 1)),
+    ("boxed_in", (4, 4), (1, 1), (200, 1)),  # player 2's king is left without a move
+])
+def test_api_rules_on_known_positions(api, positions, board, frm, to, expected):
+    assert api.move(api.game_at(getattr(positions, board)), frm, to) == expected
@@ -0,0 +1,30 @@
+import asyncio
+
+import rules
+
+
+def test_compact_document_round_trips(server, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    play(game_id, players[1], first_move)
+    game = server.game_cache.get(game_id)
+    doc = server.encode_game(game)
+    assert doc["game_state"]["board"] == rules.to_string(rules.from_board(game.game_state.board))
+    assert all(isinstance(move, int) for move in doc["game_state"]["moves"])
+    decoded = server.decode_game(doc)
+    # Packed moves keep millisecond offsets, so compare everything but sub-millisecond timestamps
+    assert decoded.model_dump(exclude={"game_state": {"moves"}}) == game.model_dump(exclude={"game_state": {"moves"}})
+    assert [(m.from_pos, m.to_pos, m.player) for m in decoded.game_state.moves] == \
+        [(m.from_pos, m.to_pos, m.player) for m in game.game_state.moves]
+
+
+def test_legacy_document_is_migrated_on_read(server, db, two_player_game):
+    game_id, _ = two_player_game
+    legacy = server.game_cache.get(game_id).model_dump()
+    asyncio.run(db.games.replace_one({"id": game_id}, legacy))
+    server.game_cache.clear()
+
+    game = asyncio.run(server.load_game(game_id))
+    stored = asyncio.run(db.games.find_one({"id": game_id}))
+    assert stored["schema"] == server.GAME_SCHEMA_VERSION
+    assert isinstance(stored["game_state"]["board"], str)
+    assert game.model_dump() == server.decode_game(stored).model_dump()
@@ -0,0 +1,21 @@
+import orjson
+
+
+def test_status_checks_page_by_id(client):
+    created = [client.post("/api/status", json={"client_name": f"client {i}"}).json() for i in range(5)]
+    ids = sorted(check["id"] for check in created)
+
+    first = client.get("/api/status", params={"limit": 3}).json()
+    assert [check["id"] for check in first] == ids[:3]
+    rest = client.get("/api/status", params={"after": first[-1]["id"], "limit": 3}).json()
+    assert [check["id"] for check in rest] == ids[3:]
+
+
+def test_status_checks_stream_as_ndjson(client):
+    for i in range(3):
+        client.post("/api/status", json={"client_name": f"client {i}"})
+    streamed = client.get("/api/status", params={"format": "ndjson"})
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    lines = [orjson.loads(line) for line in streamed.content.splitlines()]
+    assert sorted(line["client_name"] for line in lines) == ["client 0", "client 1", "client 2"]
+    assert client.get("/api/status", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,31 @@
+import asyncio
+from datetime import datetime
+
+def test_stored_json_matches_the_model_serialization(server, db, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    play(game_id, players[1], first_move)
+    doc = asyncio.run(db.games.find_one({"id": game_id}))
+    assert server.stored_game_json(doc) == server.decode_game(doc).model_dump_json().encode()
+
+    # Whole-second timestamps serialize without a fraction in both paths
+    doc["created_at"] = doc["updated_at"] = datetime(2026, 1, 1, 12, 0, 0)
+    doc["game_state"]["winner"] = 1
+    doc["status"] = "finished"
+    assert server.stored_game_json(doc) == server.decode_game(doc).model_dump_json().encode()
+
+
+def test_engine_game_json_matches_the_model_serialization(server, db, engine_game):
+    doc = asyncio.run(db.games.find_one({"id": engine_game[0]}))
+    assert server.stored_game_json(doc) == server.decode_game(doc).model_dump_json().encode()
+
+
+def test_finished_game_is_served_from_the_stored_document(server, db, client, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    play(game_id, players[1], first_move)
+    asyncio.run(db.games.update_one({"id": game_id}, {"$set": {"status": "finished"}}))
+    server.game_cache.clear()
+    server.response_bodies.clear()
+
+    served = client.get(f"/api/game/{game_id}").json()
+    assert served["status"] == "finished" and len(served["game_state"]["moves"]) == 1
+    assert server.game_cache.get(game_id) is None
@@ -0,0 +1,120 @@
+import pytest
+
+import rules
+import tablebase
+
+
+def test_pack_round_trips(playout_positions):
+    for bb, player in playout_positions(300, 0):
+        key = tablebase.pack(bb, player)
+        assert key < 1 << 61
+        assert tablebase.unpack(key) == (bb, player)
+
+
+def test_mirror_folds_a_position_and_its_image_together(playout_positions):
+    for bb, player in playout_positions(300, 1):
+        image = tablebase.mirror(bb)
+        assert tablebase.mirror(image) == bb
+        assert rules.to_string(image) == "".join(
+            rules.to_string(bb)[row:row + 5][::-1] for row in range(0, 25, 5)
+        )
+        assert tablebase.canonical_key(bb, player) == tablebase.canonical_key(image, player)
+        assert tablebase.canonical_key(bb, player) in (tablebase.pack(bb, player), tablebase.pack(image, player))
+
+
+def test_written_table_probes_every_entry_and_its_mirror(playout_positions, tmp_path):
+    positions = playout_positions(200, 2)
+    values = {
+        tablebase.canonical_key(bb, player): tablebase.TablebaseEntry(index % 3 + 1, index)
+        for index, (bb, player) in enumerate(positions)
+    }
+    path = tmp_path / "test.kvtb"
+    tablebase.write_tablebase(path, values, plies=4)
+
+    table = tablebase.open_tablebase(str(path))
+    try:
+        assert (table.plies, table.entries) == (4, len(values))
+        for bb, player in positions:
+            expected = values[tablebase.canonical_key(bb, player)]
+            assert table.probe(bb, player) == expected
+            assert table.probe(tablebase.mirror(bb), player) == expected
+        unsolved = next(pos for pos in playout_positions(400, 3) if tablebase.canonical_key(*pos) not in values)
+        assert table.probe(*unsolved) is None
+    finally:
+        table.close()
+    assert tablebase.open_tablebase(str(tmp_path / "missing.kvtb")) is None
+
+
+def reachable_keys(bb, player, plies):
+    """Canonical keys within plies of a position, like enumerate_positions does from the initial one"""
+    seen = {tablebase.canonical_key(bb, player)}
+    layer = list(seen)
+    for _ in range(plies):
+        layer = [child for key in layer for child in tablebase.successor_keys(key) if child not in seen]
+        seen.update(layer)
+    return list(seen)
+
+
+def test_enumerate_positions_walks_the_game_tree():
+    keys, closed = tablebase.enumerate_positions(2, processes=1)
+    assert sorted(keys) == sorted(reachable_keys(rules.INITIAL_BITBOARD, 1, 2))
+    assert not closed
+
+
+@pytest.mark.parametrize("board, plies", [("king_to_centre", 2), ("boxed_in", 3)])
+def test_solved_results_follow_from_their_successors(positions, board, plies):
+    start = rules.from_string(getattr(positions, board))
+    values = tablebase.solve(reachable_keys(start, 1, plies), closed=False, processes=1)
+    assert values[tablebase.canonical_key(start, 1)] == tablebase.TablebaseEntry(tablebase.WIN, 1)
+
+    def value(child):
+        if child not in values and tablebase._is_terminal(child):
+            return tablebase.TablebaseEntry(tablebase.LOSS, 0)
+        return values.get(child)
+
+    for key, entry in values.items():
+        children = [value(child) for child in tablebase.successor_keys(key)]
+        if entry.result == tablebase.WIN:
+            # Some move leaves the opponent lost, and the distance follows the fastest one
+            losses = [child.distance for child in children if child and child.result == tablebase.LOSS]
+            assert entry.distance == min(losses) + 1
+        else:
+            # Every move leaves the opponent won, or there is no move at all
+            assert entry.result == tablebase.LOSS
+            assert all(child and child.result == tablebase.WIN for child in children)
+            assert entry.distance == max((child.distance + 1 for child in children), default=0)
+    assert {entry.result for entry in values.values()} == {tablebase.WIN, tablebase.LOSS}
+
+
+@pytest.fixture
+def hint_table(server, monkeypatch, positions, tmp_path):
+    start = rules.from_string(positions.king_to_centre)
+    values = tablebase.solve(reachable_keys(start, 1, 2), closed=False, processes=1)
+    tablebase.write_tablebase(tmp_path / "hint.kvtb", values, plies=2)
+    table = tablebase.open_tablebase(str(tmp_path / "hint.kvtb"))
+    monkeypatch.setattr(server, "solved_positions", table)
+    yield table
+    table.close()
+
+
+def test_hint_is_the_tablebase_move(client, hint_table, two_player_game, set_board, positions):
+    game_id, _ = two_player_game
+    set_board(game_id, positions.king_to_centre)
+    hint = client.get(f"/api/game/{game_id}/hint").json()
+    assert hint == {
+        "player": 1, "move": {"from_pos": {"row": 0, "col": 0}, "to_pos": {"row": 2, "col": 2}},
+        "result": "win", "distance": 1,
+    }
+
+
+def test_finished_game_gets_an_empty_hint(client, hint_table, two_player_game, set_board, play, positions):
+    game_id, players = two_player_game
+    set_board(game_id, positions.king_to_centre)
+    play(game_id, players[1], {"from_row": 0, "from_col": 0, "to_row": 2, "to_col": 2})
+    hint = client.get(f"/api/game/{game_id}/hint").json()
+    assert (hint["move"], hint["result"], hint["distance"]) == (None, None, None)
+
+
+def test_hint_without_a_tablebase_is_503(server, client, monkeypatch, two_player_game):
+    monkeypatch.setattr(server, "solved_positions", None)
+    assert client.get(f"/api/game/{two_player_game[0]}/hint").status_code == 503
@@ -0,0 +1,37 @@
+import pytest
+import typer
+from typer.testing import CliRunner
+
+import tournament
+
+
+def test_play_game_is_reproducible_from_its_seed():
+    first = tournament.play_game((0, "random", "random", 7))
+    again = tournament.play_game((0, "random", "random", 7))
+    assert first._replace(seconds=0) == again._replace(seconds=0)
+    assert first.winner in (1, 2, None)
+    assert 0 < first.plies <= tournament.MAX_PLIES
+
+
+def test_engine_beats_random_play():
+    results = [tournament.play_game((i, "depth:2", "random", i)) for i in range(4)]
+    assert all(result.winner == 1 for result in results)
+
+
+def test_elo_difference():
+    assert tournament.elo_difference(0.5) == 0
+    assert tournament.elo_difference(0.75) == pytest.approx(-tournament.elo_difference(0.25))
+    assert tournament.elo_difference(0.75) == pytest.approx(190.85, abs=0.01)
+    assert tournament.elo_difference(1.0) < float("inf")
+
+
+def test_unknown_agent_is_rejected():
+    with pytest.raises(typer.BadParameter):
+        tournament.make_agent("oracle", 0)
+
+
+@pytest.mark.parametrize("option", ["--games", "--processes"])
+def test_empty_runs_are_rejected(tmp_path, option):
+    result = CliRunner().invoke(tournament.app, [option, "0", "--output", str(tmp_path / "out.ndjson")])
+    assert result.exit_code == 2
+    assert not (tmp_path / "out.ndjson").exists()
@@ -0,0 +1,66 @@
+import asyncio
+
+import orjson
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+
+def test_websocket_pushes_the_state_after_each_move(client, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    with client.websocket_connect(f"/api/game/{game_id}/ws") as websocket:
+        assert websocket.receive_json()["game"]["version"] == 1
+        play(game_id, players[1], first_move)
+        pushed = websocket.receive_json()
+    assert pushed["game"]["version"] == 2
+    assert pushed["game"]["game_state"]["current_player"] == 2
+    assert pushed["player"] == 2 and pushed["moves"]
+
+
+def test_websocket_for_an_unknown_game_is_closed(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/game/missing/ws") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 4404
+
+
+def test_websocket_gets_a_move_made_while_the_game_loads(server, client, two_player_game, play, first_move, monkeypatch):
+    game_id, players = two_player_game
+    load_game = server.load_game
+    request = server.MakeMoveRequest(game_id=game_id, player_id=players[1], **first_move)
+
+    async def load_then_move(game_id):
+        # The subscriber reads version 1, then the move lands before its snapshot goes out
+        game = await load_game(game_id)
+        monkeypatch.setattr(server, "load_game", load_game)
+        await server.make_move(request)
+        return game
+
+    monkeypatch.setattr(server, "load_game", load_then_move)
+    with client.websocket_connect(f"/api/game/{game_id}/ws") as websocket:
+        assert websocket.receive_json()["game"]["version"] == 2
+        play(game_id, players[2], {"from_row": 0, "from_col": 1, "to_row": 3, "to_col": 1})
+        assert websocket.receive_json()["game"]["version"] == 3
+
+
+def test_long_poll_returns_as_soon_as_the_game_moves(server, two_player_game, first_move):
+    game_id, players = two_player_game
+
+    async def wait_and_move():
+        waiter = asyncio.create_task(server.wait_for_game(game_id, since=1, timeout=5, accept_encoding=None))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await server.apply_move_request(server.MakeMoveRequest(game_id=game_id, player_id=players[1], **first_move))
+        return await asyncio.wait_for(waiter, 1)
+
+    response = asyncio.run(wait_and_move())
+    assert response.headers["ETag"] == '"2"'
+    assert orjson.loads(response.body)["game"]["game_state"]["current_player"] == 2
+    assert not server.game_waiters.waiting
+
+
+def test_long_poll_answers_at_once_when_behind_and_204_on_timeout(client, two_player_game):
+    game_id, _ = two_player_game
+    behind = client.get(f"/api/game/{game_id}/wait", params={"since": 0, "timeout": 5})
+    assert behind.status_code == 200 and behind.json()["game"]["version"] == 1
+    assert client.get(f"/api/game/{game_id}/wait", params={"since": 1, "timeout": 0.05}).status_code == 204
+    assert client.get("/api/game/missing/wait").status_code == 404
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+import rules
+
+REPLY = {"from_row": 0, "from_col": 1, "to_row": 3, "to_col": 1}
+
+
+def test_moves_are_written_as_targeted_updates(server, db, two_player_game, play, first_move):
+    game_id, players = two_player_game
+    play(game_id, players[1], first_move)
+    play(game_id, players[2], REPLY)
+
+    game = server.game_cache.get(game_id)
+    update = server.move_update(game, game.game_state.moves[-1:])
+    assert set(update) == {"$set", "$push"}
+    assert "players" not in update["$set"] and "game_state" not in update["$set"]
+    assert update["$push"]["game_state.moves"]["$each"] == [server.encode_move(game.game_state.moves[-1], game.created_at)]
+
+    stored = asyncio.run(db.games.find_one({"id": game_id}))
+    assert stored["version"] == 3
+    assert stored["game_state"]["board"] == rules.to_string(rules.from_board(game.game_state.board))
+    assert stored["game_state"]["moves"] == [server.encode_move(m, game.created_at) for m in game.game_state.moves]
+    assert [p["id"] for p in stored["players"]] == [players[1], players[2]]
+
+
+def test_stale_write_is_rejected_and_evicts_the_cached_copy(server, db, two_player_game):
+    game_id, _ = two_player_game
+    assert server.game_cache.get(game_id) is not None
+    update = {"$set": {"status": "finished"}}
+    with pytest.raises(server.WriteConflict):
+        asyncio.run(server.conditional_update(game_id, 0, update))
+    assert server.game_cache.get(game_id) is None
+    assert asyncio.run(db.games.find_one({"id": game_id}))["status"] == "in_progress"
+
+
+def test_concurrent_moves_from_one_version_apply_once(server, db, two_player_game, first_move, monkeypatch):
+    game_id, players = two_player_game
+    request = server.MakeMoveRequest(game_id=game_id, player_id=players[1], **first_move)
+    racers = 4
+    read_versions, conflicts = [], []
+    write = server.conditional_update
+    all_read = asyncio.Event()
+
+    async def racing_update(game_id, read_version, update):
+        # Hold every first attempt until all racers have read the game, so they all write from one version
+        read_versions.append(read_version)
+        if len(read_versions) == racers:
+            all_read.set()
+        await all_read.wait()
+        try:
+            await write(game_id, read_version, update)
+        except server.WriteConflict:
+            conflicts.append(read_version)
+            raise
+
+    async def race():
+        return await asyncio.gather(*(server.make_move(request) for _ in range(racers)), return_exceptions=True)
+
+    monkeypatch.setattr(server, "conditional_update", racing_update)
+    results = asyncio.run(race())
+    assert read_versions == [1] * racers and conflicts == [1] * (racers - 1)
+    assert sum(isinstance(result, dict) for result in results) == 1
+    rejected = [result for result in results if not isinstance(result, dict)]
+    assert all(result.status_code == 400 and result.detail == "Not your turn" for result in rejected)
+    stored = asyncio.run(db.games.find_one({"id": game_id}))
+    assert stored["version"] == 2 and len(stored["game_state"]["moves"]) == 1